@@ -0,0 +1,90 @@
+"""Throughput benchmark for filename parsing and renaming
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rename [--size N] [--batch N]
+
+Reports names per second and p50/p99 latency per name for the filename
+helpers used by auto rename, and per batch for series grouping, over the
+deterministic corpus in benchmarks/corpus.py.
+"""
+import argparse
+import time
+from benchmarks.corpus import CORPUS_SIZE, generate_corpus
+from helper.naming import batch_rename, is_valid_filename, process_filename_auto
+from helper.rules import CompiledRules
+from helper.series import group_by_series
+from helper.template import CompiledTemplate, extract_fields
+
+TEMPLATE = "[Group] {filename} S[season]E[episode] [quality] [codec] [language]"
+RULES = "www.1TamilMV.com,www.TamilBlasters.com,WEBRip=>WEB-DL,/\\[[0-9A-F]{8}\\]/=>"
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def measure(label, func, names):
+    """Time func on every name separately, then report throughput and latency"""
+    timer = time.perf_counter_ns
+    samples = []
+    started = timer()
+    for name in names:
+        t0 = timer()
+        func(name)
+        samples.append(timer() - t0)
+    total = (timer() - started) / 1e9
+    print(f"{label:<22} {len(names) / total:>12,.0f} names/s"
+          f"   p50 {percentile(samples, 0.50) / 1000:>7.2f} us"
+          f"   p99 {percentile(samples, 0.99) / 1000:>7.2f} us")
+
+def measure_batch(names, batch_size, rules, template):
+    """Time batch_rename over the corpus in batches of batch_size"""
+    timer = time.perf_counter_ns
+    samples = []
+    started = timer()
+    for i in range(0, len(names), batch_size):
+        batch = names[i:i + batch_size]
+        t0 = timer()
+        batch_rename(batch, "[Group]", "", rules, template)
+        samples.append((timer() - t0) / len(batch))
+    total = (timer() - started) / 1e9
+    print(f"{'batch_rename':<22} {len(names) / total:>12,.0f} names/s"
+          f"   p50 {percentile(samples, 0.50) / 1000:>7.2f} us"
+          f"   p99 {percentile(samples, 0.99) / 1000:>7.2f} us  (per name, batches of {batch_size})")
+
+def measure_grouping(names, batch_size):
+    """Time series grouping of batches the size a user could dump at once"""
+    timer = time.perf_counter_ns
+    samples = []
+    for i in range(0, len(names), batch_size):
+        batch = names[i:i + batch_size]
+        t0 = timer()
+        group_by_series(batch)
+        samples.append(timer() - t0)
+    total = sum(samples) / 1e9
+    print(f"{'group_by_series':<22} {len(names) / total:>12,.0f} names/s"
+          f"   p50 {percentile(samples, 0.50) / 1e6:>7.2f} ms"
+          f"   p99 {percentile(samples, 0.99) / 1e6:>7.2f} ms  (per batch of {batch_size})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=CORPUS_SIZE)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    names = generate_corpus(args.size)
+    print(f"Corpus: {len(names):,} names generated in {time.perf_counter() - started:.2f}s\n")
+
+    rules = CompiledRules(RULES)
+    template = CompiledTemplate(TEMPLATE)
+    measure('is_valid_filename', is_valid_filename, names)
+    measure('extract_fields', extract_fields, names)
+    measure('rules.apply', rules.apply, names)
+    measure('template.render', template.render, names)
+    measure('process_filename_auto', lambda name: process_filename_auto(name, "[Group]", "", rules, template), names)
+    measure_batch(names, args.batch, rules, template)
+    measure_grouping(names, args.batch)
+
+if __name__ == '__main__':
+    main()
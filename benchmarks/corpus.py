@@ -0,0 +1,81 @@
+"""Deterministic corpus of anime, series and movie release names
+
+The same seed always yields the same names, so benchmark runs on different
+machines or commits parse identical input.
+"""
+import random
+
+CORPUS_SIZE = 120000
+SEED = 7
+
+GROUPS = ['SubsPlease', 'Erai-raws', 'HorribleSubs', 'Judas', 'EMBER', 'ASW', 'Anime Time',
+          'YTS', 'RARBG', 'PSA', 'Pahe', 'Tenrai-Sensei', 'DKB', 'Vyndros', 'NTb', 'FLUX']
+TITLES = ['One Piece', 'Jujutsu Kaisen', 'Attack on Titan', 'Demon Slayer', 'Frieren',
+          'Spy x Family', 'Chainsaw Man', 'Solo Leveling', 'Bleach', 'Naruto Shippuden',
+          'Mushoku Tensei', 'Vinland Saga', 'Oshi no Ko', 'Blue Lock', 'Dandadan',
+          'The Last of Us', 'Breaking Bad', 'House of the Dragon', 'The Boys', 'Severance',
+          'Stranger Things', 'The Bear', 'Shogun', 'Fallout', 'Arcane']
+MOVIES = ['Dune Part Two', 'Oppenheimer', 'Spirited Away', 'Your Name', 'Interstellar',
+          'The Dark Knight', 'Suzume', 'Parasite', 'Inception', 'Akira', 'Perfect Blue',
+          'Blade Runner 2049', 'Mad Max Fury Road', 'Princess Mononoke', 'Whiplash']
+QUALITIES = ['2160p', '1080p', '720p', '480p', '4K', 'HD', 'FHD']
+CODECS = ['x264', 'x265', 'HEVC', 'H.264', 'AV1', '10bit HEVC', 'XviD']
+LANGUAGES = ['Dual Audio', 'Multi', 'English', 'Japanese', 'Hindi', 'ESub', 'Dubbed', '']
+SOURCES = ['WEB-DL', 'WEBRip', 'BluRay', 'HDTV', 'BDRip', 'AMZN WEB-DL', 'NF WEB-DL']
+AUDIO = ['AAC2.0', 'DDP5.1', 'FLAC', 'Opus', 'AAC', 'TrueHD 7.1', 'E-AC3']
+EXTENSIONS = ['mkv'] * 6 + ['mp4'] * 3 + ['avi', 'webm']
+SEPARATORS = [' ', '.', '_']
+
+def _anime(rng):
+    title = rng.choice(TITLES)
+    episode = rng.randint(1, 1100)
+    episode_tag = rng.choice([f" - {episode:02d}", f" - {episode:02d}v2", f" [{episode:02d}]",
+                              f" E{episode:02d}", f" Episode {episode}"])
+    extras = f" ({rng.choice(QUALITIES)})" if rng.random() < 0.5 else f" [{rng.choice(QUALITIES)}]"
+    if rng.random() < 0.4:
+        extras += f" [{rng.choice(CODECS)}]"
+    if rng.random() < 0.3:
+        extras += f" [{rng.choice(LANGUAGES) or 'Sub'}]"
+    if rng.random() < 0.5:
+        extras += f" [{rng.getrandbits(32):08X}]"
+    return f"[{rng.choice(GROUPS)}] {title}{episode_tag}{extras}.{rng.choice(EXTENSIONS)}"
+
+def _series(rng):
+    sep = rng.choice(SEPARATORS)
+    season, episode = rng.randint(1, 12), rng.randint(1, 24)
+    episode_tag = rng.choice([f"S{season:02d}E{episode:02d}", f"s{season:02d}e{episode:02d}",
+                              f"{season}x{episode:02d}", f"S{season:02d}{sep}E{episode:02d}"])
+    parts = rng.choice(TITLES).split() + [episode_tag, rng.choice(QUALITIES), rng.choice(SOURCES)]
+    if rng.random() < 0.7:
+        parts += rng.choice(AUDIO).split()
+    parts += rng.choice(CODECS).split()
+    language = rng.choice(LANGUAGES)
+    if language:
+        parts += language.split()
+    name = sep.join(parts)
+    if rng.random() < 0.6:
+        name += f"-{rng.choice(GROUPS).replace(' ', '')}"
+    if rng.random() < 0.1:
+        name = f"www.{rng.choice(['1TamilMV', 'TamilBlasters', 'Torrenting'])}.com - {name}"
+    return f"{name}.{rng.choice(EXTENSIONS)}"
+
+def _movie(rng):
+    sep = rng.choice(SEPARATORS)
+    parts = rng.choice(MOVIES).split() + [str(rng.randint(1985, 2025)), rng.choice(QUALITIES),
+                                           rng.choice(SOURCES)] + rng.choice(CODECS).split()
+    if rng.random() < 0.5:
+        parts += rng.choice(AUDIO).split()
+    name = sep.join(parts)
+    if rng.random() < 0.5:
+        name += f"-{rng.choice(GROUPS).replace(' ', '')}"
+    return f"{name}.{rng.choice(EXTENSIONS)}"
+
+def generate_corpus(size=CORPUS_SIZE, seed=SEED):
+    """Return `size` release names, identical for the same seed"""
+    rng = random.Random(seed)
+    makers = [_anime] * 4 + [_series] * 4 + [_movie] * 2
+    return [rng.choice(makers)(rng) for _ in range(size)]
+
+if __name__ == '__main__':
+    for name in generate_corpus(20):
+        print(name)
@@ -100,6 +100,10 @@ class Bot(Client):
         # Start the ping service in the background
         asyncio.create_task(self.ping_service())
 
+        # Pick up channel backfills interrupted by the restart
+        from plugins.channel_watch import resume_backfills
+        asyncio.create_task(resume_backfills(self))
+
     async def stop(self):
         await super().stop()
         print("Bot stopped!")
@@ -47,11 +47,32 @@ class Config:
     SHORTENER_URL = environ.get("SHORTENER_URL", "")
     
     # File Processing Configuration
-    MAX_FILE_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
+    MAX_FILE_SIZE = 2000 * 1024 * 1024  # Telegram upload limit, 2000 MiB (not 2 GiB)
     DOWNLOAD_LOCATION = "./downloads/"
     
+    # ffmpeg Scheduler Configuration
+    FFMPEG_CORES = int(environ.get("FFMPEG_CORES", "0")) or os.cpu_count() or 1
+    # Address-space limit per ffmpeg process, 0 for none. Multithreaded
+    # decoding of 4K/HEVC reserves a lot of address space, keep it generous
+    FFMPEG_MEMORY_LIMIT_MB = int(environ.get("FFMPEG_MEMORY_LIMIT_MB", "0"))
+    
+    # Media Extras Configuration
+    SAMPLE_DURATION = int(environ.get("SAMPLE_DURATION", "30"))
+    SCREENSHOT_COUNT = int(environ.get("SCREENSHOT_COUNT", "6"))
+    PARALLEL_UPLOADS = int(environ.get("PARALLEL_UPLOADS", "3"))
+    # Files of a sequence processed at the same time
+    SEQUENCE_WORKERS = int(environ.get("SEQUENCE_WORKERS", "3"))
+    # Channel posts renamed at the same time by watches and backfills
+    CHANNEL_WORKERS = int(environ.get("CHANNEL_WORKERS", "3"))
+    # Parallel HTTP Range connections per URL download
+    URL_CONNECTIONS = int(environ.get("URL_CONNECTIONS", "4"))
+    # Largest file /url downloads, in MB (0 for no limit)
+    URL_MAX_SIZE = int(environ.get("URL_MAX_SIZE_MB", "4096")) * 1024 * 1024
+    
     # Anti-NSFW Configuration
     ANTI_NSFW_ENABLED = environ.get("ANTI_NSFW_ENABLED", "True").lower() == "true"
+    # Max Hamming distance between perceptual hashes to count as a match
+    NSFW_HASH_DISTANCE = int(environ.get("NSFW_HASH_DISTANCE", "8"))
 
 class Txt:
     START_TXT = """
@@ -89,6 +110,9 @@ class Txt:
 **🎯 File Management:**
 • `/ssequence` - Start file sequence
 • `/esequence` - End file sequence
+• `/watch <channel>` - Rename new posts of a channel
+• `/backfill <channel> <from> <to>` - Rename older channel posts
+• `/url <link> [new name]` - Rename a file from a direct link
 • Send photo to set thumbnail
 • `/viewthumb` - View current thumbnail
 • `/delthumb` - Delete thumbnail
@@ -0,0 +1,211 @@
+import os
+import shutil
+import struct
+
+# Containers whose tags live in a header region we can rewrite ourselves.
+# Other audio (m4a, opus, ...) goes through the ffmpeg stream-copy pass.
+AUDIO_TAG_FORMATS = ('mp3', 'flac')
+
+# Padding left after a rewritten header so later edits fit in place
+TAG_PADDING = 4096
+
+ID3_TEXT_FRAMES = {
+    'title': 'TIT2',
+    'artist': 'TPE1',
+    'audio': 'TALB',
+    'encoded_by': 'TENC',
+}
+VORBIS_KEYS = {
+    'title': 'TITLE',
+    'artist': 'ARTIST',
+    'audio': 'ALBUM',
+    'encoded_by': 'ENCODED-BY',
+    'custom_tag': 'COMMENT',
+}
+
+FLAC_STREAMINFO = 0
+FLAC_PADDING = 1
+FLAC_VORBIS_COMMENT = 4
+FLAC_PICTURE = 6
+
+def _syncsafe(value):
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+def _unsyncsafe(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+def _image_mime(cover_data):
+    return 'image/png' if cover_data.startswith(b'\x89PNG') else 'image/jpeg'
+
+def _rewrite_header(path, old_size, header):
+    """Replace the first old_size bytes of a file with header
+
+    When the new header has the same size it is written in place, otherwise
+    the audio payload is copied behind it without being touched.
+    """
+    if len(header) == old_size:
+        with open(path, 'r+b') as f:
+            f.write(header)
+        return
+
+    tmp_path = f"{path}.tag"
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        dst.write(header)
+        src.seek(old_size)
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, path)
+
+# ID3v2 (mp3)
+
+def _read_id3(f):
+    """Return (version, total tag size, frames) of the ID3v2 tag at the start of f"""
+    header = f.read(10)
+    if len(header) < 10 or header[:3] != b'ID3':
+        return 3, 0, []
+    version, flags = header[3], header[5]
+    size = _unsyncsafe(header[6:10]) + 10
+    if flags & 0x10:
+        size += 10
+    body = f.read(size - 10)
+
+    frames = []
+    if flags & 0x80 or flags & 0x40 or version not in (3, 4):
+        # Unsynchronised or extended tags are replaced rather than merged
+        return version if version in (3, 4) else 3, size, frames
+
+    pos = 0
+    while pos + 10 <= len(body) and body[pos] != 0:
+        frame_id = body[pos:pos + 4].decode('latin-1')
+        frame_size = _unsyncsafe(body[pos + 4:pos + 8]) if version == 4 else struct.unpack('>I', body[pos + 4:pos + 8])[0]
+        frame_flags = body[pos + 8:pos + 10]
+        frames.append((frame_id, frame_flags, body[pos + 10:pos + 10 + frame_size]))
+        pos += 10 + frame_size
+    return version, size, frames
+
+def _id3_frame(version, frame_id, payload, flags=b'\x00\x00'):
+    size = _syncsafe(len(payload)) if version == 4 else struct.pack('>I', len(payload))
+    return frame_id.encode('latin-1') + size + flags + payload
+
+def _id3_text(version, text):
+    if version == 4:
+        return b'\x03' + text.encode('utf-8')
+    return b'\x01' + text.encode('utf-16')
+
+def write_id3_tags(path, fields, cover=None):
+    with open(path, 'rb') as f:
+        version, old_size, frames = _read_id3(f)
+
+    replaced = {ID3_TEXT_FRAMES[k] for k in ID3_TEXT_FRAMES if fields.get(k)}
+    if fields.get('custom_tag'):
+        replaced.add('COMM')
+    if cover:
+        replaced.add('APIC')
+
+    body = b''.join(
+        _id3_frame(version, frame_id, payload, flags)
+        for frame_id, flags, payload in frames if frame_id not in replaced
+    )
+    for field, frame_id in ID3_TEXT_FRAMES.items():
+        if fields.get(field):
+            body += _id3_frame(version, frame_id, _id3_text(version, fields[field]))
+    if fields.get('custom_tag'):
+        comment = _id3_text(version, fields['custom_tag'])
+        # encoding, language, empty description, text
+        body += _id3_frame(version, 'COMM', comment[:1] + b'eng' + (b'\x00' if version == 4 else b'\xff\xfe\x00\x00') + comment[1:])
+    if cover:
+        with open(cover, 'rb') as c:
+            data = c.read()
+        body += _id3_frame(version, 'APIC', b'\x00' + _image_mime(data).encode() + b'\x00\x03\x00' + data)
+
+    # Reuse the old tag size when the new frames fit in it
+    if old_size and len(body) + 10 <= old_size:
+        tag_size = old_size
+    else:
+        tag_size = len(body) + 10 + TAG_PADDING
+    header = b'ID3' + bytes([version, 0, 0]) + _syncsafe(tag_size - 10)
+    _rewrite_header(path, old_size, header + body + b'\x00' * (tag_size - 10 - len(body)))
+
+# FLAC
+
+def _read_flac_blocks(f):
+    """Return (metadata size including the fLaC marker, blocks)"""
+    if f.read(4) != b'fLaC':
+        raise ValueError("Not a FLAC file")
+    blocks = []
+    size = 4
+    while True:
+        header = f.read(4)
+        if len(header) < 4:
+            raise ValueError("Truncated FLAC metadata")
+        last, block_type = header[0] & 0x80, header[0] & 0x7F
+        length = int.from_bytes(header[1:4], 'big')
+        blocks.append((block_type, f.read(length)))
+        size += 4 + length
+        if last:
+            return size, blocks
+
+def _vorbis_comment(existing, fields):
+    vendor = b'Auto Rename Bot'
+    comments = []
+    if existing:
+        vendor_len = struct.unpack('<I', existing[:4])[0]
+        vendor = existing[4:4 + vendor_len]
+        pos = 4 + vendor_len
+        count = struct.unpack('<I', existing[pos:pos + 4])[0]
+        pos += 4
+        for _ in range(count):
+            length = struct.unpack('<I', existing[pos:pos + 4])[0]
+            comments.append(existing[pos + 4:pos + 4 + length])
+            pos += 4 + length
+
+    replaced = {VORBIS_KEYS[k].encode() for k in VORBIS_KEYS if fields.get(k)}
+    comments = [c for c in comments if c.split(b'=', 1)[0].upper() not in replaced]
+    for field, key in VORBIS_KEYS.items():
+        if fields.get(field):
+            comments.append(f"{key}={fields[field]}".encode('utf-8'))
+
+    data = struct.pack('<I', len(vendor)) + vendor + struct.pack('<I', len(comments))
+    for comment in comments:
+        data += struct.pack('<I', len(comment)) + comment
+    return data
+
+def _flac_picture(cover):
+    with open(cover, 'rb') as c:
+        data = c.read()
+    mime = _image_mime(data).encode()
+    # front cover, mime, empty description, unknown dimensions
+    return (struct.pack('>I', 3) + struct.pack('>I', len(mime)) + mime + struct.pack('>I', 0)
+            + struct.pack('>IIII', 0, 0, 0, 0) + struct.pack('>I', len(data)) + data)
+
+def write_flac_tags(path, fields, cover=None):
+    with open(path, 'rb') as f:
+        old_size, blocks = _read_flac_blocks(f)
+
+    existing_comment = next((data for t, data in blocks if t == FLAC_VORBIS_COMMENT), None)
+    kept = [(t, data) for t, data in blocks
+            if t not in (FLAC_PADDING, FLAC_VORBIS_COMMENT) and not (cover and t == FLAC_PICTURE)]
+    kept.insert(1, (FLAC_VORBIS_COMMENT, _vorbis_comment(existing_comment, fields)))
+    if cover:
+        kept.append((FLAC_PICTURE, _flac_picture(cover)))
+
+    used = 4 + sum(4 + len(data) for _, data in kept)
+    # A padding block needs at least its own 4 byte header
+    padding = old_size - used - 4
+    if padding < 0:
+        padding = TAG_PADDING
+    kept.append((FLAC_PADDING, b'\x00' * padding))
+
+    header = b'fLaC'
+    for i, (block_type, data) in enumerate(kept):
+        flag = 0x80 if i == len(kept) - 1 else 0
+        header += bytes([flag | block_type]) + len(data).to_bytes(3, 'big') + data
+    _rewrite_header(path, old_size, header)
+
+def write_audio_tags(path, container, fields, cover=None):
+    """Rewrite only the tag header of an mp3 or flac file, embedding cover art"""
+    if container == 'mp3':
+        write_id3_tags(path, fields, cover)
+    elif container == 'flac':
+        write_flac_tags(path, fields, cover)
+    else:
+        raise ValueError(f"Unsupported audio container: {container}")
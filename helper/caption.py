@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import math
+import os
+import re
+from helper.integrity import get_media
+from helper.media import probe_streams
+from helper.template import extract_fields
+
+# Variables resolved from the message alone
+CHEAP_VARIABLES = ('filename', 'filesize', 'duration')
+# Variables that need the filename parsed or the output probed
+LAZY_VARIABLES = ('resolution', 'codec', 'bitrate', 'episode', 'season', 'quality')
+CAPTION_VARIABLES = CHEAP_VARIABLES + LAZY_VARIABLES
+
+VARIABLE_PATTERN = re.compile(r"\{(" + "|".join(CAPTION_VARIABLES) + r")\}")
+
+def get_readable_file_size(size_bytes):
+    """Convert bytes to readable format"""
+    if size_bytes == 0:
+        return "0B"
+    size_name = ["B", "KB", "MB", "GB", "TB"]
+    i = int(math.floor(math.log(size_bytes, 1024)))
+    p = math.pow(1024, i)
+    s = round(size_bytes / p, 2)
+    return f"{s} {size_name[i]}"
+
+def format_duration(seconds, with_hours=True):
+    mins, secs = divmod(int(seconds), 60)
+    hours, mins = divmod(mins, 60)
+    if hours and with_hours:
+        return f"{hours:02d}:{mins:02d}:{secs:02d}"
+    return f"{mins + hours * 60:02d}:{secs:02d}"
+
+class CaptionContext:
+    """Variables of one output file, each computed at most once
+
+    The ffprobe call behind resolution, codec and bitrate is shared and only
+    made when a caption references one of them.
+    """
+
+    def __init__(self, message, filename, path=None, job_id=None):
+        self.message = message
+        self.filename = filename
+        self.path = path
+        self.job_id = job_id
+        self.values = {}
+        self._probe = None
+
+    async def probe(self):
+        if self._probe is None:
+            self._probe = asyncio.ensure_future(probe_streams(self.path, self.job_id))
+        return await self._probe
+
+    async def get(self, name):
+        if name not in self.values:
+            self.values[name] = await self.resolve(name)
+        return self.values[name]
+
+    async def resolve(self, name):
+        media = get_media(self.message)
+        if name == 'filename':
+            return self.filename
+        if name == 'filesize':
+            size = getattr(media, 'file_size', 0) or 0
+            if not size and self.path and os.path.exists(self.path):
+                size = os.path.getsize(self.path)
+            return get_readable_file_size(size)
+        if name == 'duration':
+            if self.message.video and self.message.video.duration:
+                return format_duration(self.message.video.duration)
+            if self.message.audio and self.message.audio.duration:
+                return format_duration(self.message.audio.duration, with_hours=False)
+            # Files without Telegram media (URL downloads) are probed too
+            if self.path and (media is None or self.message.video or self.message.audio):
+                duration = (await self.probe())['duration']
+                return format_duration(duration) if duration else "Unknown"
+            return "Unknown"
+        if name in ('episode', 'season', 'quality'):
+            return extract_fields(self.filename).get(name) or ""
+        if not self.path:
+            return ""
+        info = await self.probe()
+        if name == 'resolution':
+            return f"{info['width']}x{info['height']}" if info['width'] else ""
+        if name == 'codec':
+            return info['codec'] or ""
+        if name == 'bitrate':
+            return f"{info['bitrate'] // 1000} kbps" if info['bitrate'] else ""
+        return ""
+
+class CompiledCaption:
+    """A caption template split once into literal text and variables"""
+
+    def __init__(self, template):
+        self.template = template
+        self.parts = []
+        position = 0
+        for match in VARIABLE_PATTERN.finditer(template):
+            if match.start() > position:
+                self.parts.append((False, template[position:match.start()]))
+            self.parts.append((True, match.group(1)))
+            position = match.end()
+        if position < len(template):
+            self.parts.append((False, template[position:]))
+        self.variables = {value for is_variable, value in self.parts if is_variable}
+
+    async def render(self, context):
+        # Only the referenced variables are resolved
+        values = {name: await context.get(name) for name in self.variables}
+        return "".join(
+            str(values[value]) if is_variable else value
+            for is_variable, value in self.parts
+        )
+
+# Compiled captions per user, invalidated by set_caption
+_caption_cache = {}
+
+def get_compiled_caption(user_id, template):
+    """Return the user's compiled caption, recompiling only when it changed"""
+    if not template:
+        return None
+    cached = _caption_cache.get(user_id)
+    if cached is None or cached.template != template:
+        cached = CompiledCaption(template)
+        _caption_cache[user_id] = cached
+    return cached
+
+def invalidate_caption(user_id):
+    _caption_cache.pop(user_id, None)
+
+async def render_caption(user_id, template, message, filename, path=None, job_id=None):
+    """Render the user's caption for an output file, the filename when none is set"""
+    compiled = get_compiled_caption(user_id, template)
+    if compiled is None:
+        return filename
+    try:
+        return await compiled.render(CaptionContext(message, filename, path, job_id))
+    except Exception as e:
+        logging.error(f"Caption preparation error: {e}")
+        return filename
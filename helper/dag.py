@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import time
+
+class StageError(Exception):
+    """Wraps the exception of the stage that failed a job graph"""
+
+    def __init__(self, stage, error):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+
+class JobGraph:
+    """A small dependency graph of async stages
+
+    Every stage is a coroutine function taking the dict of results produced
+    so far. A stage starts as soon as all of its dependencies finished, so
+    independent stages run concurrently. Start offset and duration of each
+    stage are recorded in `timings`.
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self.stages = {}
+        self.results = {}
+        self.timings = {}
+
+    def add(self, name, func, deps=()):
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage {name}")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        self.stages[name] = (func, tuple(deps))
+        return self
+
+    async def run(self):
+        """Run every stage and return the results, raising StageError on failure"""
+        started = time.monotonic()
+        tasks = {}
+
+        async def run_stage(name, func, deps):
+            if deps:
+                await asyncio.gather(*(tasks[dep] for dep in deps))
+            stage_start = time.monotonic()
+            try:
+                self.results[name] = await func(self.results)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                raise StageError(name, e) from e
+            finally:
+                self.timings[name] = (stage_start - started, time.monotonic() - stage_start)
+            return self.results[name]
+
+        # Stages can only depend on earlier ones, so insertion order is topological
+        for name, (func, deps) in self.stages.items():
+            tasks[name] = asyncio.create_task(run_stage(name, func, deps))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            self.log_timings(time.monotonic() - started)
+        return self.results
+
+    def log_timings(self, total):
+        stages = ", ".join(
+            f"{name} +{offset:.2f}s/{duration:.2f}s"
+            for name, (offset, duration) in sorted(self.timings.items(), key=lambda item: item[1][0])
+        )
+        logging.info(f"Job {self.name} finished in {total:.2f}s [{stages}]")
@@ -3,6 +3,9 @@ import datetime
 import pytz
 from config import Config
 import logging
+from helper.template import invalidate_template
+from helper.rules import invalidate_rules
+from helper.caption import invalidate_caption
 
 class Database:
     def __init__(self, uri, database_name):
@@ -16,6 +19,10 @@ class Database:
         self.DARKXSIDE78 = self._client[database_name]
         self.col = self.DARKXSIDE78.user
         self.token_links = self.DARKXSIDE78.token_links
+        self.content_keys = self.DARKXSIDE78.content_keys
+        self.nsfw_hashes = self.DARKXSIDE78.nsfw_hashes
+        self.sequences = self.DARKXSIDE78.sequences
+        self.channel_watches = self.DARKXSIDE78.channel_watches
 
     def new_user(self, id):
         return dict(
@@ -51,6 +58,8 @@ class Database:
             remove_words=None,
             sample_video=False,
             screenshot_enabled=False,
+            album_mode=False,
+            remux_mode=False,
             manual_mode=True,
             ban_status=dict(
                 is_banned=False,
@@ -119,6 +128,7 @@ class Database:
     async def set_caption(self, id, caption):
         try:
             await self.col.update_one({"_id": int(id)}, {"$set": {"caption": caption}})
+            invalidate_caption(int(id))
         except Exception as e:
             logging.error(f"Error setting caption for user {id}: {e}")
 
@@ -135,6 +145,7 @@ class Database:
             await self.col.update_one(
                 {"_id": int(id)}, {"$set": {"format_template": format_template}}
             )
+            invalidate_template(int(id))
         except Exception as e:
             logging.error(f"Error setting format template for user {id}: {e}")
 
@@ -196,6 +207,118 @@ class Database:
             logging.error(f"Error claiming token: {e}")
             return {"success": False, "message": "Database error"}
 
+    async def add_content_key(self, sha256, size, file_unique_id):
+        try:
+            update = {"$set": {"size": size, "last_seen": datetime.datetime.now(pytz.utc)}}
+            if file_unique_id:
+                update["$addToSet"] = {"file_unique_ids": file_unique_id}
+            await self.content_keys.update_one({"_id": sha256}, update, upsert=True)
+        except Exception as e:
+            logging.error(f"Error adding content key {sha256}: {e}")
+
+    async def add_nsfw_hash(self, phash, added_by):
+        try:
+            await self.nsfw_hashes.update_one(
+                {"_id": f"{phash:016x}"},
+                {"$set": {"added_by": added_by, "added_on": datetime.datetime.now(pytz.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Error adding NSFW hash: {e}")
+
+    async def remove_nsfw_hash(self, phash):
+        try:
+            result = await self.nsfw_hashes.delete_one({"_id": f"{phash:016x}"})
+            return result.deleted_count > 0
+        except Exception as e:
+            logging.error(f"Error removing NSFW hash: {e}")
+            return False
+
+    async def get_nsfw_hashes(self):
+        try:
+            return [int(doc["_id"], 16) async for doc in self.nsfw_hashes.find({}, {"_id": 1})]
+        except Exception as e:
+            logging.error(f"Error loading NSFW hashes: {e}")
+            return []
+
+    async def start_sequence(self, user_id):
+        try:
+            await self.sequences.replace_one(
+                {"_id": int(user_id)},
+                {"files": [], "started_on": datetime.datetime.now(pytz.utc)},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Error starting sequence for user {user_id}: {e}")
+
+    async def add_to_sequence(self, user_id, chat_id, message_id):
+        """Append a file to the user's open sequence, False when none is open"""
+        try:
+            result = await self.sequences.update_one(
+                {"_id": int(user_id)},
+                {"$push": {"files": {"chat_id": chat_id, "message_id": message_id}}}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            logging.error(f"Error adding to sequence for user {user_id}: {e}")
+            return False
+
+    async def get_sequence(self, user_id):
+        try:
+            return await self.sequences.find_one({"_id": int(user_id)})
+        except Exception as e:
+            logging.error(f"Error getting sequence for user {user_id}: {e}")
+            return None
+
+    async def end_sequence(self, user_id):
+        """Close the user's sequence and return it"""
+        try:
+            return await self.sequences.find_one_and_delete({"_id": int(user_id)})
+        except Exception as e:
+            logging.error(f"Error ending sequence for user {user_id}: {e}")
+            return None
+
+    async def set_channel_watch(self, chat_id, owner_id, target, watching=True):
+        try:
+            await self.channel_watches.update_one(
+                {"_id": int(chat_id)},
+                {"$set": {"owner": int(owner_id), "target": target, "watching": watching}},
+                upsert=True
+            )
+        except Exception as e:
+            logging.error(f"Error setting channel watch for {chat_id}: {e}")
+
+    async def get_channel_watch(self, chat_id):
+        try:
+            return await self.channel_watches.find_one({"_id": int(chat_id)})
+        except Exception as e:
+            logging.error(f"Error getting channel watch for {chat_id}: {e}")
+            return None
+
+    async def remove_channel_watch(self, chat_id):
+        try:
+            result = await self.channel_watches.delete_one({"_id": int(chat_id)})
+            return result.deleted_count > 0
+        except Exception as e:
+            logging.error(f"Error removing channel watch for {chat_id}: {e}")
+            return False
+
+    async def save_backfill(self, chat_id, backfill):
+        """Store the backfill range and checkpoint of a watched channel"""
+        try:
+            await self.channel_watches.update_one(
+                {"_id": int(chat_id)}, {"$set": {"backfill": backfill}}
+            )
+        except Exception as e:
+            logging.error(f"Error saving backfill checkpoint for {chat_id}: {e}")
+
+    async def get_running_backfills(self):
+        try:
+            return [doc async for doc in self.channel_watches.find({"backfill.running": True})]
+        except Exception as e:
+            logging.error(f"Error loading running backfills: {e}")
+            return []
+
     async def get_user_settings(self, user_id):
         try:
             user = await self.col.find_one({"_id": int(user_id)})
@@ -212,12 +335,41 @@ class Database:
                 'remove_words': user.get('remove_words'),
                 'sample_video': user.get('sample_video', False),
                 'screenshot_enabled': user.get('screenshot_enabled', False),
+                'album_mode': user.get('album_mode', False),
+                'remux_mode': user.get('remux_mode', False),
                 'manual_mode': user.get('manual_mode', True)
             }
         except Exception as e:
             logging.error(f"Error getting user settings: {e}")
             return {}
 
+    async def get_job_settings(self, user_id):
+        """Everything a rename job needs, loaded with a single query"""
+        try:
+            user = await self.col.find_one({"_id": int(user_id)}) or {}
+        except Exception as e:
+            logging.error(f"Error getting job settings: {e}")
+            user = {}
+        metadata_fields = None
+        if user.get('metadata', 'Off') != 'Off':
+            metadata_fields = {
+                field: user.get(field)
+                for field in ('title', 'author', 'artist', 'audio', 'subtitle',
+                              'video', 'encoded_by', 'custom_tag')
+            }
+        return {
+            'send_as': user.get('send_as', 'DOCUMENT'),
+            'upload_destination': user.get('upload_destination'),
+            'sample_video': user.get('sample_video', False),
+            'screenshot_enabled': user.get('screenshot_enabled', False),
+            'album_mode': user.get('album_mode', False),
+            'remux_mode': user.get('remux_mode', False),
+            'thumbnail': user.get('file_id'),
+            'caption': user.get('caption'),
+            'format_template': user.get('format_template'),
+            'metadata_fields': metadata_fields
+        }
+
     async def update_user_setting(self, user_id, setting_name, value):
         try:
             await self.col.update_one(
@@ -275,6 +427,7 @@ class Database:
                 {"_id": int(user_id)},
                 {"$set": {"remove_words": words}}
             )
+            invalidate_rules(int(user_id))
         except Exception as e:
             logging.error(f"Error setting remove words: {e}")
 
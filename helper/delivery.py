@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+from pyrogram.enums import ChatMemberStatus, ChatType
+from pyrogram.types import InputMediaDocument, InputMediaVideo, InputMediaAudio
+
+def parse_destination(text):
+    """Turn user input into a chat id or @username, None clears the setting"""
+    text = text.strip()
+    if text.lower() in ("none", "off", "clear", "0"):
+        return None
+    if text.lstrip("-").isdigit():
+        return int(text)
+    if text.startswith("https://t.me/"):
+        text = "@" + text[len("https://t.me/"):].strip("/")
+    return text if text.startswith("@") else f"@{text}"
+
+async def resolve_destination(client, reference, user_id):
+    """Resolve a chat the user may post in, returns (chat, None) or (None, error)
+
+    The bot copies files there on the user's behalf, so being able to see
+    the chat is not enough: channels need an admin with post rights and
+    groups a member allowed to send messages.
+    """
+    try:
+        chat = await client.get_chat(reference)
+        if chat.id == user_id:
+            return chat, None
+        member = await client.get_chat_member(chat.id, user_id)
+    except Exception as e:
+        return None, f"Cannot access `{reference}`: {e}"
+
+    if member.status == ChatMemberStatus.OWNER:
+        return chat, None
+    if member.status == ChatMemberStatus.ADMINISTRATOR:
+        privileges = member.privileges
+        if chat.type == ChatType.CHANNEL and not (privileges and privileges.can_post_messages):
+            return None, "You are not allowed to post in that channel."
+        return chat, None
+    if member.status == ChatMemberStatus.MEMBER and chat.type != ChatType.CHANNEL:
+        permissions = chat.permissions
+        if permissions is None or permissions.can_send_messages:
+            return chat, None
+    return None, "You must be allowed to post in that chat."
+
+async def deliver_to_destination(client, sent_message, destination):
+    """Deliver an already uploaded file to the user's upload destination
+
+    copy_message reuses the file stored on Telegram's side, so the output
+    is never uploaded a second time.
+    """
+    if not destination or not sent_message:
+        return None
+    try:
+        return await client.copy_message(
+            chat_id=destination,
+            from_chat_id=sent_message.chat.id,
+            message_id=sent_message.id
+        )
+    except Exception as e:
+        logging.error(f"Delivery to {destination} failed: {e}")
+        return None
+
+# Telegram accepts at most 10 items per media group
+ALBUM_SIZE = 10
+# Seconds without a new file before a partial album is sent
+ALBUM_IDLE_TIMEOUT = 10
+
+def remove_output(path):
+    """Remove an uploaded output and its per-job temporary directory"""
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+        directory = os.path.dirname(path)
+        if os.path.basename(directory).startswith("rename_"):
+            os.rmdir(directory)
+    except Exception as e:
+        logging.error(f"Cleanup error: {e}")
+
+def build_input_media(send_path, path, caption, thumb):
+    if send_path == 'video':
+        return InputMediaVideo(path, caption=caption, thumb=thumb, supports_streaming=True)
+    if send_path == 'audio':
+        return InputMediaAudio(path, caption=caption, thumb=thumb)
+    return InputMediaDocument(path, caption=caption, thumb=thumb)
+
+class AlbumCollector:
+    """Group finished outputs into send_media_group calls of up to 10 items
+
+    Documents and audio cannot share an album with other media types, so
+    each chat has one buffer per group kind. Items keep their arrival order.
+    """
+
+    def __init__(self, size=ALBUM_SIZE, idle_timeout=ALBUM_IDLE_TIMEOUT):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.buffers = {}
+        self.timers = {}
+
+    async def add(self, client, chat_id, send_path, path, caption=None, thumb=None, destination=None,
+                  cleanup=None):
+        """Queue an output, cleanup is called instead of deleting path once it was sent"""
+        group = 'visual' if send_path == 'video' else send_path
+        key = (chat_id, group)
+        self.buffers.setdefault(key, []).append(
+            (build_input_media(send_path, path, caption, thumb), path, destination, cleanup)
+        )
+
+        timer = self.timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        if len(self.buffers[key]) >= self.size:
+            await self.flush(client, key)
+        else:
+            self.timers[key] = asyncio.create_task(self._flush_later(client, key))
+
+    async def _flush_later(self, client, key):
+        await asyncio.sleep(self.idle_timeout)
+        self.timers.pop(key, None)
+        await self.flush(client, key)
+
+    async def flush(self, client, key):
+        items = self.buffers.pop(key, [])
+        if not items:
+            return
+        chat_id = key[0]
+        try:
+            if len(items) == 1:
+                # A single item cannot form a media group
+                media = items[0][0]
+                sender = {
+                    InputMediaVideo: client.send_video,
+                    InputMediaAudio: client.send_audio,
+                }.get(type(media), client.send_document)
+                sent = [await sender(chat_id, media.media, caption=media.caption, thumb=media.thumb)]
+            else:
+                sent = await client.send_media_group(chat_id, [item[0] for item in items])
+
+            destinations = {item[2] for item in items if item[2]}
+            for destination in destinations:
+                try:
+                    if len(sent) > 1:
+                        await client.copy_media_group(destination, chat_id, sent[0].id)
+                    else:
+                        await deliver_to_destination(client, sent[0], destination)
+                except Exception as e:
+                    logging.error(f"Album delivery to {destination} failed: {e}")
+        except Exception as e:
+            logging.error(f"Album upload failed: {e}")
+            try:
+                await client.send_message(chat_id, f"❌ **Album upload failed:** {e}")
+            except:
+                pass
+        finally:
+            for _, path, _, cleanup in items:
+                if cleanup:
+                    cleanup()
+                else:
+                    remove_output(path)
+
+album_collector = AlbumCollector()
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+from config import Config
+
+# nice and ionice levels per lane, interactive jobs win over bulk work
+LANES = {
+    'interactive': {'nice': 5, 'ionice_class': '2', 'ionice_level': '4'},
+    'batch': {'nice': 15, 'ionice_class': '2', 'ionice_level': '7'},
+}
+DEFAULT_TIMEOUT = 30 * 60
+
+class FFmpegCancelled(Exception):
+    """Raised when a process is started for a job that was cancelled"""
+
+class FFmpegScheduler:
+    """Shared executor for ffmpeg and ffprobe processes
+
+    At most `cores` processes run at once so media work never starves the
+    event loop. Each process runs in its own process group with a nice level,
+    an optional address-space limit and a timeout, and its CPU time is
+    charged to the job that started it. Priorities and limits are applied by
+    wrapping the command in nice, ionice and prlimit rather than a
+    preexec_fn, which is unsafe in a process with worker threads.
+    """
+
+    def __init__(self, cores=None, memory_limit_mb=None):
+        self.cores = cores or os.cpu_count() or 1
+        self.memory_limit = (memory_limit_mb or 0) * 1024 * 1024
+        self.semaphore = asyncio.Semaphore(self.cores)
+        self.nice = shutil.which('nice')
+        self.ionice = shutil.which('ionice')
+        self.prlimit = shutil.which('prlimit')
+        if self.memory_limit and not self.prlimit:
+            logging.warning("prlimit not found, ffmpeg runs without a memory limit")
+        self.processes = {}
+        self.cpu_seconds = {}
+        self.cancelled = set()
+
+    def _wrap(self, cmd, lane):
+        """Prefix cmd with the lane's priorities; each wrapper execs the next, keeping the pid"""
+        if self.nice:
+            cmd = [self.nice, '-n', str(LANES[lane]['nice'])] + cmd
+        if self.ionice:
+            cmd = [self.ionice, '-c', LANES[lane]['ionice_class'], '-n', LANES[lane]['ionice_level']] + cmd
+        if self.memory_limit and self.prlimit:
+            cmd = [self.prlimit, f"--as={self.memory_limit}", '--'] + cmd
+        return cmd
+
+    def _kill(self, pid):
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        except Exception as e:
+            logging.error(f"Failed to kill process group {pid}: {e}")
+
+    async def run(self, cmd, job_id=None, lane='interactive', timeout=DEFAULT_TIMEOUT):
+        """Run a command and return its exit code, output and CPU usage"""
+        async with self.semaphore:
+            if job_id is not None and job_id in self.cancelled:
+                raise FFmpegCancelled(f"Job {job_id} was cancelled")
+
+            with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+                process = subprocess.Popen(
+                    self._wrap(cmd, lane),
+                    stdin=subprocess.DEVNULL,
+                    stdout=stdout_file,
+                    stderr=stderr_file,
+                    start_new_session=True
+                )
+                self.processes.setdefault(job_id, set()).add(process.pid)
+
+                # wait4 reaps the child and returns its own resource usage
+                loop = asyncio.get_running_loop()
+                waiter = loop.run_in_executor(None, os.wait4, process.pid, 0)
+                timed_out = False
+                try:
+                    _, status, usage = await asyncio.wait_for(asyncio.shield(waiter), timeout)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    logging.warning(f"ffmpeg timed out after {timeout}s: {' '.join(cmd[:6])}")
+                    self._kill(process.pid)
+                    _, status, usage = await waiter
+                except asyncio.CancelledError:
+                    self._kill(process.pid)
+                    await waiter
+                    raise
+                finally:
+                    pids = self.processes.get(job_id)
+                    if pids is not None:
+                        pids.discard(process.pid)
+                        if not pids:
+                            del self.processes[job_id]
+
+                returncode = os.waitstatus_to_exitcode(status)
+                process.returncode = returncode
+                cpu = usage.ru_utime + usage.ru_stime
+                if job_id is not None:
+                    self.cpu_seconds[job_id] = self.cpu_seconds.get(job_id, 0.0) + cpu
+
+                stdout_file.seek(0)
+                stderr_file.seek(0)
+                return {
+                    'returncode': returncode,
+                    'stdout': stdout_file.read(),
+                    'stderr': stderr_file.read().decode(errors='ignore'),
+                    'cpu_seconds': cpu,
+                    'timed_out': timed_out,
+                    'cancelled': job_id is not None and job_id in self.cancelled,
+                }
+
+    def cancel(self, job_id):
+        """Kill every running process of a job and refuse new ones"""
+        self.cancelled.add(job_id)
+        pids = list(self.processes.get(job_id, ()))
+        for pid in pids:
+            self._kill(pid)
+        return len(pids)
+
+    def cancel_user(self, user_id):
+        """Cancel all running jobs of a user, job ids are (user_id, message_id)"""
+        jobs = [job_id for job_id in self.processes if isinstance(job_id, tuple) and job_id[0] == user_id]
+        return sum(self.cancel(job_id) for job_id in jobs)
+
+    def finish(self, job_id):
+        """Forget a finished job and return the CPU seconds it used"""
+        self.cancelled.discard(job_id)
+        cpu = self.cpu_seconds.pop(job_id, 0.0)
+        if cpu:
+            logging.info(f"Job {job_id} used {cpu:.2f} CPU seconds in ffmpeg")
+        return cpu
+
+ffmpeg_scheduler = FFmpegScheduler(Config.FFMPEG_CORES, Config.FFMPEG_MEMORY_LIMIT_MB)
@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import logging
+import time
+from pyrogram.errors import FileReferenceExpired, FloodWait, InternalServerError, ServiceUnavailable
+from helper.refresh import reference_refresher
+from helper.utils import progress_for_pyrogram
+
+# stream_media always yields 1 MiB chunks and takes its offset in chunks
+CHUNK_SIZE = 1024 * 1024
+MAX_REFETCHES = 3
+# Network and Telegram server errors worth retrying with doubling delays, anything else is raised
+TRANSIENT_ERRORS = (OSError, asyncio.TimeoutError, InternalServerError, ServiceUnavailable)
+MAX_RETRIES = 5
+
+class IntegrityError(Exception):
+    """Raised when a download does not match the size Telegram reported"""
+
+def get_media(message):
+    """Return the document, video or audio attached to a message"""
+    return message.document or message.video or message.audio
+
+async def download_verified(client, message, file_path, progress_msg=None):
+    """Download a file while hashing it and verify it before upload
+
+    The SHA-256 and byte count are computed on the fly so no second read
+    pass is needed. When fewer bytes than the reported file_size arrive,
+    only the missing range is fetched again. An expired file_reference is
+    refreshed and the download resumed without involving the user, flood
+    waits are slept out and network errors retried with backoff. Other
+    errors, such as a deleted message, are raised at once.
+    """
+    media = get_media(message)
+    expected = media.file_size if media else 0
+    hasher = hashlib.sha256()
+    received = 0
+    # Hash state at the last full chunk, to roll back a short trailing chunk
+    checkpoint = (0, hasher.copy())
+    start = time.time()
+    refetches = 0
+    failures = 0
+
+    with open(file_path, "wb") as f:
+        while True:
+            # Passes cut short by an error are retried by their own limits, not counted as refetches
+            interrupted = True
+            try:
+                async for chunk in client.stream_media(message, offset=received // CHUNK_SIZE):
+                    if len(chunk) < CHUNK_SIZE:
+                        checkpoint = (received, hasher.copy())
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    received += len(chunk)
+                    if progress_msg:
+                        await progress_for_pyrogram(
+                            received, expected or received, "📥 **Downloading file...**", progress_msg, start
+                        )
+                interrupted = False
+            except FileReferenceExpired:
+                logging.info(f"File reference expired at {received} bytes, refreshing")
+                message = await reference_refresher.refresh(client, message)
+            except FloodWait as e:
+                logging.warning(f"Download flood wait of {e.value}s at {received} bytes")
+                await asyncio.sleep(e.value)
+            except TRANSIENT_ERRORS as e:
+                failures += 1
+                if failures > MAX_RETRIES:
+                    raise
+                logging.warning(f"Download interrupted at {received} bytes: {e}, retrying")
+                await asyncio.sleep(2 ** failures)
+
+            # Without a reported size only a stream that ended by itself is complete
+            if received == expected or (not expected and not interrupted):
+                break
+            if expected and (received > expected or (refetches == MAX_REFETCHES and not interrupted)):
+                raise IntegrityError(f"Received {received} bytes, expected {expected}")
+
+            # Resume from the last chunk boundary, dropping any partial chunk
+            if received % CHUNK_SIZE:
+                received, hasher = checkpoint
+                f.seek(received)
+                f.truncate()
+            if not interrupted:
+                refetches += 1
+            logging.info(f"Re-fetching {expected - received} missing bytes")
+
+    return {
+        'path': file_path,
+        'size': received,
+        'sha256': hasher.hexdigest(),
+        'message': message,
+    }
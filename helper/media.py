@@ -0,0 +1,233 @@
+import asyncio
+import json
+import logging
+import os
+from config import Config
+from helper.ffmpeg_runner import ffmpeg_scheduler, FFmpegCancelled
+from helper.audio_tags import AUDIO_TAG_FORMATS, write_audio_tags
+
+# Metadata fields stored by plugins/metadata.py, mapped to container tags
+GLOBAL_TAGS = {
+    'title': 'title',
+    'author': 'author',
+    'artist': 'artist',
+    'encoded_by': 'encoded_by',
+    'custom_tag': 'comment',
+}
+# Per-stream title tags, keyed by ffmpeg stream specifier
+STREAM_TAGS = {
+    'video': 'v',
+    'audio': 'a',
+    'subtitle': 's',
+}
+
+def build_metadata_command(src, dst, fields, remux=False):
+    """Build a single-pass stream-copy ffmpeg command that tags every stream
+
+    With remux the output is an MP4 with the moov atom moved to the front,
+    keeping only the streams MP4 can carry without re-encoding.
+    """
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        '-i', src,
+    ]
+    if remux:
+        cmd += ['-map', '0:v:0', '-map', '0:a?', '-c', 'copy', '-movflags', '+faststart']
+    else:
+        cmd += ['-map', '0', '-c', 'copy']
+    for field, tag in GLOBAL_TAGS.items():
+        if fields.get(field):
+            cmd += ['-metadata', f"{tag}={fields[field]}"]
+    for field, spec in STREAM_TAGS.items():
+        if fields.get(field) and not (remux and spec == 's'):
+            cmd += [f'-metadata:s:{spec}', f"title={fields[field]}"]
+    cmd.append(dst)
+    return cmd
+
+def remux_target(path):
+    """Return the .mp4 name a remuxed output is written to"""
+    return f"{os.path.splitext(path)[0]}.mp4"
+
+async def run_ffmpeg(cmd, job_id=None, lane='interactive', timeout=None):
+    """Run an ffmpeg command through the shared scheduler and return (returncode, stderr)"""
+    kwargs = {'timeout': timeout} if timeout else {}
+    result = await ffmpeg_scheduler.run(cmd, job_id=job_id, lane=lane, **kwargs)
+    if result['cancelled']:
+        raise FFmpegCancelled(f"Job {job_id} was cancelled")
+    return result['returncode'], result['stderr']
+
+async def apply_metadata(src, dst, fields, job_id=None, remux=False):
+    """Copy src to dst with metadata applied, never re-encoding"""
+    try:
+        returncode, stderr = await run_ffmpeg(build_metadata_command(src, dst, fields, remux), job_id)
+    except FFmpegCancelled:
+        if os.path.exists(dst):
+            os.remove(dst)
+        raise
+    except Exception as e:
+        returncode, stderr = -1, str(e)
+    if returncode != 0:
+        logging.error(f"Metadata pass failed: {stderr.strip()[-500:]}")
+        try:
+            if os.path.exists(dst):
+                os.remove(dst)
+        except:
+            pass
+        return False
+    return True
+
+async def write_final_output(src, dst, metadata_fields=None, job_id=None, remux=False,
+                             container=None, cover=None):
+    """Produce the final renamed file and return its path
+
+    Metadata and the MP4 faststart remux share one ffmpeg pass that writes
+    straight to the new name, so no separate rename is needed. A remuxed
+    output ends in .mp4. mp3 and flac only get their tag header rewritten,
+    with cover as embedded art. A plain os.rename is used when nothing
+    applies or when ffmpeg cannot handle the file.
+    """
+    if metadata_fields and container in AUDIO_TAG_FORMATS and not remux:
+        os.rename(src, dst)
+        try:
+            await asyncio.to_thread(write_audio_tags, dst, container, metadata_fields, cover)
+            logging.info(f"Rewrote {container} tags of {dst}")
+            return dst
+        except Exception as e:
+            logging.error(f"Audio tag rewrite failed, using ffmpeg: {e}")
+            src = dst
+
+    attempts = []
+    if remux:
+        attempts.append((remux_target(dst), True))
+    if metadata_fields:
+        attempts.append((dst, False))
+
+    for target, with_remux in attempts:
+        if os.path.abspath(src) == os.path.abspath(target):
+            # ffmpeg cannot read and write the same path
+            moved = f"{src}.src"
+            os.rename(src, moved)
+            src = moved
+        if await apply_metadata(src, target, metadata_fields or {}, job_id, with_remux):
+            os.remove(src)
+            logging.info(f"Wrote {target}{' remuxed' if with_remux else ''} with metadata")
+            return target
+        logging.info(f"ffmpeg pass failed for {target}")
+
+    os.rename(src, dst)
+    return dst
+
+async def probe_duration(path, job_id=None):
+    """Return the container duration in seconds, 0 when unknown"""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1',
+        path,
+    ]
+    try:
+        result = await ffmpeg_scheduler.run(cmd, job_id=job_id, timeout=60)
+        return float(result['stdout'].decode().strip() or 0)
+    except FFmpegCancelled:
+        raise
+    except Exception as e:
+        logging.error(f"ffprobe failed for {path}: {e}")
+        return 0
+
+async def probe_streams(path, job_id=None):
+    """Return width, height, codec, bitrate and duration of a file in one ffprobe call"""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height,codec_name:format=duration,bit_rate',
+        '-of', 'json',
+        path,
+    ]
+    info = {'width': 0, 'height': 0, 'codec': None, 'bitrate': 0, 'duration': 0}
+    try:
+        result = await ffmpeg_scheduler.run(cmd, job_id=job_id, timeout=60)
+        data = json.loads(result['stdout'].decode() or "{}")
+        stream = (data.get('streams') or [{}])[0]
+        fmt = data.get('format') or {}
+        info.update({
+            'width': int(stream.get('width') or 0),
+            'height': int(stream.get('height') or 0),
+            'codec': stream.get('codec_name'),
+            'bitrate': int(fmt.get('bit_rate') or 0),
+            'duration': float(fmt.get('duration') or 0),
+        })
+    except FFmpegCancelled:
+        raise
+    except Exception as e:
+        logging.error(f"ffprobe failed for {path}: {e}")
+    return info
+
+def build_sample_command(src, dst, start, duration):
+    """Cut a sample with an input-side seek and stream copy, no decoding"""
+    return [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        '-ss', f"{start:.3f}",
+        '-i', src,
+        '-t', str(duration),
+        '-map', '0:v:0', '-map', '0:a?',
+        '-c', 'copy',
+        '-avoid_negative_ts', 'make_zero',
+        dst,
+    ]
+
+async def generate_sample(src, dst, duration=None, total_duration=0, job_id=None):
+    """Create a sample clip of `duration` seconds from the middle third of src"""
+    duration = duration or Config.SAMPLE_DURATION
+    total_duration = total_duration or await probe_duration(src, job_id)
+    if total_duration and total_duration <= duration:
+        start = 0
+    else:
+        start = min(total_duration * 0.3, max(total_duration - duration, 0))
+
+    returncode, stderr = await run_ffmpeg(build_sample_command(src, dst, start, duration), job_id)
+    if returncode != 0 or not os.path.exists(dst):
+        logging.error(f"Sample generation failed: {stderr.strip()[-500:]}")
+        if os.path.exists(dst):
+            os.remove(dst)
+        return None
+    return dst
+
+def build_screenshot_command(src, dst, timestamp):
+    """Grab one frame with an input-side seek, only a single frame is decoded"""
+    return [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        '-ss', f"{timestamp:.3f}",
+        '-i', src,
+        '-frames:v', '1',
+        '-vf', "scale='min(1280,iw)':-2",
+        '-q:v', '3',
+        dst,
+    ]
+
+async def take_screenshots(src, out_dir, count=None, total_duration=0, job_id=None):
+    """Take `count` evenly spaced screenshots in parallel, one short process each
+
+    The ffmpeg scheduler bounds how many of them run at once.
+    """
+    count = min(count or Config.SCREENSHOT_COUNT, 10)
+    total_duration = total_duration or await probe_duration(src, job_id)
+    if not total_duration:
+        return []
+
+    timestamps = [total_duration * (i + 1) / (count + 1) for i in range(count)]
+    paths = [os.path.join(out_dir, f"screenshot_{i + 1:02d}.jpg") for i in range(count)]
+
+    results = await asyncio.gather(*(
+        run_ffmpeg(build_screenshot_command(src, path, timestamp), job_id, timeout=120)
+        for path, timestamp in zip(paths, timestamps)
+    ), return_exceptions=True)
+
+    screenshots = []
+    for path, result in zip(paths, results):
+        if isinstance(result, FFmpegCancelled):
+            raise result
+        if not isinstance(result, Exception) and result[0] == 0 and os.path.exists(path):
+            screenshots.append(path)
+        else:
+            logging.error(f"Screenshot failed for {path}: {result}")
+    return screenshots
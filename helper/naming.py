@@ -0,0 +1,88 @@
+import logging
+import os
+from helper.rules import CompiledRules
+from helper.template import extract_fields
+
+INVALID_CHARS = frozenset('/\\:*?"<>|')
+
+def is_valid_filename(filename):
+    """Check if filename is valid and has extension"""
+    if not filename or filename.strip() == "":
+        return False
+
+    # Check for invalid characters
+    if not INVALID_CHARS.isdisjoint(filename):
+        return False
+
+    # Check if it has an extension (at least one dot with something after it)
+    if '.' not in filename or filename.endswith('.'):
+        return False
+
+    return True
+
+def _finish_name(filename, prefix, suffix, template, fields=None):
+    """Apply template, prefix and suffix to a name the rules already cleaned"""
+    # Apply the format template, files missing one of its fields keep their name
+    rendered = template.render(filename, fields) if template else None
+    if rendered:
+        filename = rendered
+
+    # Split filename and extension
+    name, ext = os.path.splitext(filename)
+
+    # Add prefix and suffix
+    if prefix:
+        name = f"{prefix} {name}"
+    if suffix:
+        name = f"{name} {suffix}"
+
+    return f"{name.strip()}{ext}"
+
+def process_filename_auto(filename, prefix="", suffix="", rules=None, template=None):
+    """Process filename with auto rename settings
+
+    rules is a CompiledRules or the raw remove_words text, template is a
+    CompiledTemplate; fields are extracted after the rules are applied and
+    before prefix and suffix are added. The original name is returned when
+    the result is not a valid filename.
+    """
+    try:
+        if not isinstance(rules, CompiledRules):
+            rules = CompiledRules(rules or "")
+        # Remove and replace words, cleaning up dots and spaces in the same pass
+        new_name = _finish_name(rules.apply(filename), prefix, suffix, template)
+        # Templates and replacements are user text and may produce a path
+        if not is_valid_filename(new_name):
+            logging.warning(f"Auto rename produced invalid name {new_name!r}, keeping {filename!r}")
+            return filename
+        return new_name
+    except Exception as e:
+        logging.error(f"Error processing filename: {e}")
+        return filename
+
+def batch_rename(filenames, prefix="", suffix="", rules=None, template=None):
+    """Rename many filenames with the same settings in one call
+
+    Rules are compiled once for the whole batch. Returns one dict per input
+    with the new name, whether it is a valid filename and the fields
+    extracted from it.
+    """
+    if not isinstance(rules, CompiledRules):
+        rules = CompiledRules(rules or "")
+
+    results = []
+    for filename in filenames:
+        try:
+            cleaned = rules.apply(filename)
+            fields = extract_fields(cleaned)
+            new_name = _finish_name(cleaned, prefix, suffix, template, fields)
+        except Exception as e:
+            logging.error(f"Error processing filename {filename}: {e}")
+            new_name, fields = filename, {}
+        results.append({
+            'filename': filename,
+            'new_name': new_name,
+            'valid': is_valid_filename(new_name),
+            'fields': fields,
+        })
+    return results
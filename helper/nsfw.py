@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from config import Config
+from helper.database import DARKXSIDE78
+from helper.phash import phash, BKTree
+
+# In-memory index of admin-banned perceptual hashes, loaded on first use
+nsfw_index = None
+nsfw_index_lock = asyncio.Lock()
+
+# Verdicts cached by file_unique_id so repeat files skip hashing
+verdict_cache = OrderedDict()
+VERDICT_CACHE_SIZE = 10000
+
+async def get_nsfw_index():
+    global nsfw_index
+    if nsfw_index is None:
+        async with nsfw_index_lock:
+            if nsfw_index is None:
+                hashes = await DARKXSIDE78.get_nsfw_hashes()
+                nsfw_index = BKTree.build(hashes)
+                logging.info(f"Loaded {nsfw_index.size} banned perceptual hashes")
+    return nsfw_index
+
+def cache_verdict(file_unique_id, verdict):
+    if not file_unique_id:
+        return
+    verdict_cache[file_unique_id] = verdict
+    verdict_cache.move_to_end(file_unique_id)
+    while len(verdict_cache) > VERDICT_CACHE_SIZE:
+        verdict_cache.popitem(last=False)
+
+def cached_verdict(file_unique_id):
+    """Verdict of a file checked before, None when it was not"""
+    if file_unique_id not in verdict_cache:
+        return None
+    verdict_cache.move_to_end(file_unique_id)
+    return verdict_cache[file_unique_id]
+
+async def check_anti_nsfw(file_path: str, file_unique_id: str = None) -> bool:
+    """
+    Check if a file contains NSFW content
+    Returns True if NSFW, False if safe
+
+    file_path is an image (thumbnail or keyframe) or a list of them. Their
+    perceptual hashes are looked up in the BK-tree of banned hashes, fully
+    locally and in milliseconds.
+    """
+    if not Config.ANTI_NSFW_ENABLED:
+        return False
+
+    verdict = cached_verdict(file_unique_id)
+    if verdict is not None:
+        return verdict
+
+    try:
+        index = await get_nsfw_index()
+        if not index.size:
+            return False
+
+        paths = file_path if isinstance(file_path, (list, tuple)) else [file_path]
+        verdict = False
+        for path in paths:
+            if not path or not os.path.exists(path):
+                continue
+            matches = index.search(await asyncio.to_thread(phash, path), Config.NSFW_HASH_DISTANCE)
+            if matches:
+                logging.info(f"NSFW match for {path} at distance {matches[0][0]}")
+                verdict = True
+                break
+
+        cache_verdict(file_unique_id, verdict)
+        return verdict
+
+    except Exception as e:
+        logging.error(f"NSFW check failed: {e}")
+        return False  # Default to safe if check fails
+
+async def is_nsfw_content(file_path: str) -> bool:
+    """
+    Alias for check_anti_nsfw for compatibility
+    """
+    return await check_anti_nsfw(file_path)
+
+def reset_nsfw_index():
+    """Drop the index and cached verdicts, BK-trees do not support deletion"""
+    global nsfw_index
+    nsfw_index = None
+    verdict_cache.clear()
+
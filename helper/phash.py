@@ -0,0 +1,82 @@
+import math
+from PIL import Image
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+
+# Cosine table of the 32-point DCT-II, only the low 8 frequencies are kept
+_DCT = [
+    [math.cos(math.pi * (2 * x + 1) * u / (2 * DCT_SIZE)) for x in range(DCT_SIZE)]
+    for u in range(HASH_SIZE)
+]
+
+def phash(image_path):
+    """64-bit perceptual hash from the low frequencies of a 32x32 DCT"""
+    with Image.open(image_path) as image:
+        image = image.convert("L").resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS)
+        pixels = list(image.getdata())
+    rows = [pixels[i * DCT_SIZE:(i + 1) * DCT_SIZE] for i in range(DCT_SIZE)]
+
+    # Separable DCT: transform rows first, then the 8 kept columns
+    row_dct = [[sum(c * p for c, p in zip(coeffs, row)) for coeffs in _DCT] for row in rows]
+    low = [
+        sum(_DCT[u][x] * row_dct[x][v] for x in range(DCT_SIZE))
+        for u in range(HASH_SIZE) for v in range(HASH_SIZE)
+    ]
+
+    # The DC term only reflects overall brightness and is left out of the median
+    median = sorted(low[1:])[len(low[1:]) // 2]
+    value = 0
+    for coefficient in low:
+        value = (value << 1) | (coefficient > median)
+    return value
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance for near-duplicate lookups"""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value):
+        if self.root is None:
+            self.root = (value, {})
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (value, {})
+                self.size += 1
+                return
+            node = child
+
+    def search(self, value, radius):
+        """Return (distance, hash) of every stored hash within radius"""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            stored, children = stack.pop()
+            distance = hamming(value, stored)
+            if distance <= radius:
+                found.append((distance, stored))
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return sorted(found)
+
+    @classmethod
+    def build(cls, values):
+        tree = cls()
+        for value in values:
+            tree.add(value)
+        return tree
@@ -0,0 +1,486 @@
+import asyncio
+import contextlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pyrogram.types import InputMediaPhoto
+from config import Config
+from helper.database import DARKXSIDE78
+from helper.caption import render_caption
+from helper.dag import JobGraph, StageError
+from helper.delivery import deliver_to_destination, album_collector
+from helper.ffmpeg_runner import ffmpeg_scheduler
+from helper.integrity import download_verified, get_media
+from helper.media import write_final_output, generate_sample, take_screenshots, probe_duration
+from helper.sequence import OrderedDelivery
+from helper.sniff import sniff_message, sniff_file, choose_send_path
+from helper.splitter import plan_split, split_output
+from helper.thumbnails import prepare_thumbnail, extract_thumbnail
+from helper.uploader import upload_media, upload_parallel, send_prepared, deliver_prepared
+from helper.utils import humanbytes
+from helper.nsfw import cached_verdict, check_anti_nsfw, get_nsfw_index
+
+# Seconds between edits of a job group's shared status message
+STATUS_INTERVAL = 3
+
+# Stage names shown to the user when a job fails
+STAGE_LABELS = {
+    'download': 'Download',
+    'output': 'Rename',
+    'upload': 'Upload',
+    'nsfw_thumb': 'Anti-NSFW check',
+    'nsfw': 'Anti-NSFW check',
+}
+
+class SilentStatus:
+    """Stands in for a progress message when a job should not report per file"""
+
+    async def edit_text(self, *args, **kwargs):
+        pass
+
+    async def edit(self, *args, **kwargs):
+        pass
+
+    async def delete(self, *args, **kwargs):
+        pass
+
+def get_download_name(message, user_id):
+    """Original filename to download to, with a sensible fallback"""
+    if message.document:
+        return message.document.file_name or f"document_{user_id}.bin"
+    if message.video:
+        return message.video.file_name or f"video_{user_id}.mp4"
+    if message.audio:
+        return message.audio.file_name or f"audio_{user_id}.mp3"
+    return f"file_{user_id}.bin"
+
+async def send_sample(client, chat_id, sample_path, reply_to=None):
+    """Upload a finished sample clip and remove it from disk"""
+    if not sample_path:
+        return None
+    try:
+        return await client.send_video(
+            chat_id=chat_id,
+            video=sample_path,
+            caption=f"🎞️ **Sample:** `{os.path.basename(sample_path)}`",
+            supports_streaming=True,
+            reply_to_message_id=reply_to.id if reply_to else None
+        )
+    except Exception as e:
+        logging.error(f"Sample upload error: {e}")
+        return None
+    finally:
+        try:
+            os.remove(sample_path)
+        except:
+            pass
+
+async def send_screenshots(client, chat_id, screenshots, reply_to=None):
+    """Send finished screenshots as a single media group and remove them"""
+    if not screenshots:
+        return None
+    try:
+        media = [InputMediaPhoto(path) for path in screenshots]
+        media[0].caption = f"📸 **{len(screenshots)} Screenshots**"
+        return await client.send_media_group(
+            chat_id=chat_id,
+            media=media,
+            reply_to_message_id=reply_to.id if reply_to else None
+        )
+    except Exception as e:
+        logging.error(f"Screenshot upload error: {e}")
+        return None
+    finally:
+        for path in screenshots:
+            try:
+                os.remove(path)
+            except:
+                pass
+
+async def run_rename_job(client, message, new_filename, progress_msg=None, turn=None,
+                         user_id=None, chat_id=None, settings=None, source=None):
+    """Download, rename and upload one file as a graph of concurrent stages
+
+    Settings, the user's thumbnail and the container sniff are prepared while
+    the download runs; sample and screenshots are cut while the main file
+    uploads. turn is an async context manager entered right before sending,
+    used by sequences to deliver files in order. user_id and chat_id default
+    to the sender and chat of message; channel posts have no sender, so the
+    owner of the channel watch is passed instead. settings lets a job group
+    share one get_job_settings result. source replaces the Telegram file of
+    message with another input, such as a UrlSource, which is downloaded
+    and then sniffed from disk. Returns True when the file was delivered.
+    """
+    user_id = user_id or message.from_user.id
+    chat_id = chat_id or message.chat.id
+    job_id = (user_id, message.id)
+    media = get_media(message) if source is None else None
+    video_duration = message.video.duration if media and message.video else 0
+    temp_dir = tempfile.mkdtemp(prefix=f"rename_{user_id}_")
+    download_path = os.path.join(temp_dir, source.name if source else get_download_name(message, user_id))
+
+    # The temp dir is removed once the job and, in album mode, the album are done
+    holders = {'count': 1}
+
+    def release():
+        holders['count'] -= 1
+        if holders['count'] <= 0:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if progress_msg is None:
+        progress_msg = await client.send_message(chat_id, "📥 **Downloading file...**")
+
+    async def load_settings(r):
+        return settings if settings is not None else await DARKXSIDE78.get_job_settings(user_id)
+
+    def unique_id(r):
+        # Files from other sources are keyed by content for the thumbnail and NSFW caches
+        return media.file_unique_id if media else f"sha256_{r['download']['sha256'][:32]}"
+
+    async def sniff(r):
+        if source is not None:
+            return await asyncio.to_thread(sniff_file, r['download']['path'])
+        # Only the first chunk is read, the send path is known before the transfer
+        return await sniff_message(client, message)
+
+    async def download(r):
+        if source is not None:
+            result = await source.download(download_path, progress_msg)
+        else:
+            result = await download_verified(client, message, download_path, progress_msg)
+        if not os.path.exists(result['path']):
+            raise Exception("Download failed - file not found")
+        logging.info(f"Downloaded file to: {result['path']} (sha256 {result['sha256']})")
+        return result
+
+    async def admission(r):
+        settings, sniffed = r['settings'], r['sniff']
+        send_path = choose_send_path(sniffed, settings.get('send_as'), new_filename)
+        # Files above the upload limit are split, decided from the reported size
+        split_parts = plan_split(media.file_size if media else r['download']['size'])
+        if split_parts > 1:
+            await progress_msg.edit_text(
+                f"📥 **Downloading file...**\n\n"
+                f"File is larger than {humanbytes(Config.MAX_FILE_SIZE)} and will be "
+                f"uploaded in {split_parts} parts."
+            )
+        return {
+            'send_path': send_path,
+            'split_parts': split_parts,
+            'is_video': send_path == 'video' or bool(sniffed and sniffed.get('kind') == 'video'),
+            'is_media': send_path != 'document' or bool(sniffed and sniffed.get('kind') != 'document'),
+        }
+
+    async def user_thumbnail(r):
+        # Downloaded and fitted while the main file is still transferring
+        thumb_id = r['settings'].get('thumbnail')
+        return await prepare_thumbnail(client, thumb_id) if thumb_id else None
+
+    async def output(r):
+        settings, plan, sniffed = r['settings'], r['admission'], r['sniff']
+        # A name with a directory part would be written outside temp_dir
+        if not new_filename or os.path.basename(new_filename) != new_filename:
+            raise Exception(f"Invalid file name: {new_filename}")
+        await progress_msg.edit_text("🔄 **Renaming file...**")
+        metadata_fields = settings.get('metadata_fields') if plan['is_media'] else None
+        # Remux to a faststart MP4 unless the sniff shows it already streams
+        remux = bool(settings.get('remux_mode') and plan['send_path'] == 'video'
+                     and sniffed and sniffed.get('needs_remux'))
+        path = await write_final_output(
+            r['download']['path'], os.path.join(temp_dir, new_filename),
+            metadata_fields, job_id, remux=remux,
+            container=sniffed.get('container') if sniffed else None,
+            # Audio tags embed the user's thumbnail as cover art
+            cover=r['user_thumbnail'] if plan['send_path'] == 'audio' else None
+        )
+        if not os.path.exists(path):
+            raise Exception("New file not found")
+        logging.info(f"Renamed file from {r['download']['path']} to {path}")
+        return path
+
+    async def probe(r):
+        if not r['admission']['is_video']:
+            return 0
+        return video_duration or await probe_duration(r['output'], job_id)
+
+    # Optional stages log their errors and return nothing, only download,
+    # output, nsfw and upload can fail the job
+    async def thumbnail(r):
+        if r['user_thumbnail']:
+            return r['user_thumbnail']
+        try:
+            return await prepare_thumbnail(
+                client, None, media_path=r['output'], file_unique_id=unique_id(r),
+                is_video=r['admission']['is_video'], total_duration=r['probe'], job_id=job_id
+            )
+        except Exception as e:
+            logging.error(f"Thumbnail stage error: {e}")
+            return None
+
+    async def nsfw_thumb(r):
+        """Decide from the cache or the Telegram thumbnail while the file downloads,
+        None when only a frame of the output can tell"""
+        # Nothing to compare against while no hash is banned
+        if not Config.ANTI_NSFW_ENABLED or not (await get_nsfw_index()).size:
+            return False
+        verdict = cached_verdict(unique_id(r))
+        if verdict is None:
+            thumbs = getattr(media, 'thumbs', None)
+            if thumbs:
+                # The same Telegram thumbnail /banhash hashes, no ffmpeg needed
+                image = await client.download_media(
+                    thumbs[-1].file_id, file_name=os.path.join(temp_dir, "nsfw_thumb.jpg")
+                )
+                verdict = bool(image) and await check_anti_nsfw([image], unique_id(r))
+            elif r['admission']['is_video']:
+                return None
+            else:
+                verdict = False
+        if verdict:
+            raise Exception("File blocked by the anti-NSFW filter")
+        return False
+
+    async def nsfw(r):
+        if r['nsfw_thumb'] is not None:
+            return r['nsfw_thumb']
+        image = await extract_thumbnail(r['output'], unique_id(r), r['probe'], job_id)
+        if image and await check_anti_nsfw([image], unique_id(r)):
+            raise Exception("File blocked by the anti-NSFW filter")
+        return False
+
+    async def sample(r):
+        if not (r['settings'].get('sample_video') and r['admission']['is_video']):
+            return None
+        try:
+            return await generate_sample(
+                r['output'],
+                os.path.join(temp_dir, f"Sample - {os.path.basename(r['output'])}"),
+                total_duration=r['probe'], job_id=job_id
+            )
+        except Exception as e:
+            logging.error(f"Sample stage error: {e}")
+            return None
+
+    async def screenshots(r):
+        if not (r['settings'].get('screenshot_enabled') and r['admission']['is_video']):
+            return []
+        try:
+            return await take_screenshots(r['output'], temp_dir, total_duration=r['probe'], job_id=job_id)
+        except Exception as e:
+            logging.error(f"Screenshots stage error: {e}")
+            return []
+
+    async def upload(r):
+        settings, plan = r['settings'], r['admission']
+        path = r['output']
+        filename = os.path.basename(path)
+        destination = settings.get('upload_destination')
+        caption = await render_caption(user_id, settings.get('caption'), message, filename, path, job_id)
+
+        ordered = turn or contextlib.nullcontext()
+
+        # Album mode hands the output to the collector, which releases the temp dir
+        if settings.get('album_mode') and plan['split_parts'] == 1:
+            holders['count'] += 1
+            async with ordered:
+                await album_collector.add(
+                    client, chat_id, plan['send_path'], path,
+                    caption=caption, thumb=r['thumbnail'], destination=destination,
+                    cleanup=release
+                )
+            return None
+
+        await progress_msg.edit_text("📤 **Uploading file...**")
+        if plan['split_parts'] > 1:
+            # Upload all parts in parallel, then deliver them as an ordered album
+            await progress_msg.edit_text(f"✂️ **Splitting into {plan['split_parts']} parts...**")
+            parts, playable = await split_output(
+                path, temp_dir, plan['split_parts'],
+                is_video=plan['send_path'] == 'video',
+                total_duration=r['probe'], job_id=job_id
+            )
+            as_video = playable and plan['send_path'] == 'video'
+            durations = [0] * len(parts)
+            if as_video:
+                durations = await asyncio.gather(*(probe_duration(part, job_id) for part in parts))
+            await progress_msg.edit_text(f"📤 **Uploading {len(parts)} parts...**")
+            prepared = await upload_parallel(client, chat_id, [
+                {
+                    'path': part,
+                    'caption': f"{caption}\n\n**Part {i}/{len(parts)}**",
+                    'thumb': r['thumbnail'],
+                    'as_video': as_video,
+                    'duration': duration,
+                }
+                for i, (part, duration) in enumerate(zip(parts, durations), 1)
+            ])
+            async with ordered:
+                message_ids = await send_prepared(client, chat_id, prepared)
+            await deliver_prepared(client, chat_id, message_ids, destination)
+            return None
+
+        if turn is not None:
+            # Upload while earlier files are still processing, only the send waits
+            prepared = await upload_media(
+                client, chat_id, path, caption=caption, thumb=r['thumbnail'],
+                as_video=plan['send_path'] == 'video', as_audio=plan['send_path'] == 'audio',
+                duration=r['probe'] or getattr(media, 'duration', 0) or 0
+            )
+            async with turn:
+                message_ids = await send_prepared(client, chat_id, [prepared])
+            await deliver_prepared(client, chat_id, message_ids, destination)
+            return await client.get_messages(chat_id, message_ids[0]) if message_ids else None
+
+        if plan['send_path'] == 'video':
+            sent = await client.send_video(
+                chat_id=chat_id,
+                video=path,
+                caption=caption,
+                thumb=r['thumbnail'],
+                supports_streaming=True
+            )
+        elif plan['send_path'] == 'audio':
+            sent = await client.send_audio(
+                chat_id=chat_id,
+                audio=path,
+                caption=caption,
+                thumb=r['thumbnail']
+            )
+        else:
+            sent = await client.send_document(
+                chat_id=chat_id,
+                document=path,
+                caption=caption,
+                thumb=r['thumbnail']
+            )
+
+        # Copy to the upload destination instead of uploading twice
+        await deliver_to_destination(client, sent, destination)
+        return sent
+
+    async def extras(r):
+        # Sample and screenshots go next to the main file
+        await send_sample(client, chat_id, r['sample'], reply_to=r['upload'])
+        await send_screenshots(client, chat_id, r['screenshots'], reply_to=r['upload'])
+
+    async def log(r):
+        # Records which Telegram files share the verified content, nothing reads it back yet
+        await DARKXSIDE78.add_content_key(
+            r['download']['sha256'], r['download']['size'], media.file_unique_id if media else None
+        )
+        try:
+            await DARKXSIDE78.col.update_one({"_id": user_id}, {"$inc": {"rename_count": 1}})
+        except Exception as stats_error:
+            logging.error(f"Stats update error: {stats_error}")
+
+    graph = JobGraph(f"{user_id}:{message.id}")
+    graph.add('settings', load_settings)
+    if source is not None:
+        # Nothing to sniff remotely, the header is read once the file is on disk
+        graph.add('download', download)
+        graph.add('sniff', sniff, ('download',))
+    else:
+        graph.add('sniff', sniff)
+        graph.add('download', download)
+    graph.add('admission', admission, ('settings', 'sniff'))
+    graph.add('user_thumbnail', user_thumbnail, ('settings',))
+    graph.add('output', output, ('download', 'admission', 'user_thumbnail'))
+    graph.add('probe', probe, ('output',))
+    graph.add('thumbnail', thumbnail, ('output', 'probe', 'user_thumbnail'))
+    graph.add('sample', sample, ('output', 'probe'))
+    graph.add('screenshots', screenshots, ('output', 'probe'))
+    graph.add('nsfw_thumb', nsfw_thumb, ('admission',))
+    # Waits for the output only to extract a frame, nsfw_thumb decides every other file
+    graph.add('nsfw', nsfw, ('nsfw_thumb', 'output', 'probe'))
+    graph.add('upload', upload, ('output', 'thumbnail', 'admission', 'nsfw'))
+    graph.add('extras', extras, ('upload', 'sample', 'screenshots'))
+    graph.add('log', log, ('upload', 'download'))
+
+    try:
+        results = await graph.run()
+        if results['settings'].get('album_mode') and results['admission']['split_parts'] == 1:
+            await progress_msg.delete()
+        else:
+            await progress_msg.edit_text(
+                f"✅ **File renamed and uploaded successfully!**\n\n"
+                f"**New Name:** `{os.path.basename(results['output'])}`\n"
+                f"**Type:** {results['output'].lower().split('.')[-1].upper()}"
+            )
+        return True
+    except StageError as e:
+        logging.error(f"Rename job {graph.name} failed in {e.stage}: {e.error}")
+        label = STAGE_LABELS.get(e.stage, 'Process')
+        try:
+            await progress_msg.edit_text(f"❌ **{label} failed:** {str(e.error)}")
+        except:
+            pass
+        return False
+    except Exception as e:
+        logging.error(f"Rename and upload error: {e}")
+        try:
+            await progress_msg.edit_text(f"❌ **Process failed:** {str(e)}")
+        except:
+            pass
+        return False
+    finally:
+        ffmpeg_scheduler.finish(job_id)
+        release()
+
+async def run_job_group(client, user_id, jobs, status_msg, title="Batch", workers=None):
+    """Run (message, new_filename) jobs on a worker pool as one group
+
+    Settings are loaded once for the whole group, every job reports to the
+    shared status message instead of its own, and outputs are delivered in
+    the order of jobs. Returns the number of files delivered.
+    """
+    settings = await DARKXSIDE78.get_job_settings(user_id)
+    delivery = OrderedDelivery()
+    queue = asyncio.Queue()
+    for index, (message, new_filename) in enumerate(jobs):
+        queue.put_nowait((index, message, new_filename))
+    results = [False] * len(jobs)
+    state = {'finished': 0, 'edited': 0}
+
+    async def report(final=False):
+        # Status edits are throttled, the final one always goes out
+        now = time.monotonic()
+        if not final and now - state['edited'] < STATUS_INTERVAL:
+            return
+        state['edited'] = now
+        done = sum(results)
+        failed = state['finished'] - done
+        try:
+            await status_msg.edit_text(
+                (f"✅ **{title} finished!**\n\n" if final else f"🔄 **{title} in progress...**\n\n")
+                + f"**Renamed:** {done}/{len(jobs)}"
+                + (f"\n**Failed:** {failed}" if failed else "")
+            )
+        except:
+            pass
+
+    async def worker():
+        # Workers take jobs in order, so the next file to send is always running
+        while True:
+            try:
+                index, message, new_filename = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                results[index] = await run_rename_job(
+                    client, message, new_filename, progress_msg=SilentStatus(),
+                    turn=delivery.turn(index), user_id=user_id, settings=settings
+                )
+            except Exception as e:
+                logging.error(f"{title} job {index} for user {user_id} failed: {e}")
+            finally:
+                # A failed file must not hold back the ones after it
+                await delivery.complete(index)
+                state['finished'] += 1
+                await report()
+
+    workers = min(workers or Config.SEQUENCE_WORKERS, len(jobs)) or 1
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    await report(final=True)
+    return sum(results)
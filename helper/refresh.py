@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import time
+
+# get_messages accepts up to 200 ids per call
+MAX_IDS_PER_CALL = 200
+# Jobs that waited longer than this get a fresh file_reference before download
+REFERENCE_MAX_AGE = 120
+
+class ReferenceRefresher:
+    """Re-fetch source messages whose file_reference went stale
+
+    Requests arriving within a short window are coalesced so every chat
+    costs a single batched get_messages call.
+    """
+
+    def __init__(self, delay=0.3):
+        self.delay = delay
+        self.pending = {}
+        self.flushers = {}
+
+    async def refresh(self, client, message):
+        """Return a freshly fetched copy of message"""
+        chat_id = message.chat.id
+        future = asyncio.get_running_loop().create_future()
+        self.pending.setdefault(chat_id, {}).setdefault(message.id, []).append(future)
+        if chat_id not in self.flushers:
+            self.flushers[chat_id] = asyncio.create_task(self._flush(client, chat_id))
+        fresh = await future
+        return fresh or message
+
+    async def refresh_jobs(self, client, jobs, key='original_message'):
+        """Patch the message of every job in place, batched per chat"""
+        jobs = [job for job in jobs if job.get(key)]
+        fresh = await asyncio.gather(*(self.refresh(client, job[key]) for job in jobs))
+        for job, message in zip(jobs, fresh):
+            job[key] = message
+            job['created_at'] = time.time()
+        return jobs
+
+    async def refresh_stale(self, client, jobs, max_age=REFERENCE_MAX_AGE, key='original_message'):
+        """Refresh only the jobs that have been waiting longer than max_age"""
+        now = time.time()
+        stale = [job for job in jobs if now - job.get('created_at', now) > max_age]
+        if stale:
+            await self.refresh_jobs(client, stale, key)
+        return stale
+
+    async def _flush(self, client, chat_id):
+        await asyncio.sleep(self.delay)
+        waiting = self.pending.pop(chat_id, {})
+        self.flushers.pop(chat_id, None)
+        ids = list(waiting)
+        for i in range(0, len(ids), MAX_IDS_PER_CALL):
+            batch = ids[i:i + MAX_IDS_PER_CALL]
+            try:
+                messages = await client.get_messages(chat_id, batch)
+                found = {m.id: m for m in messages if m and not m.empty}
+            except Exception as e:
+                logging.error(f"File reference refresh failed for chat {chat_id}: {e}")
+                found = {}
+            for message_id in batch:
+                for future in waiting[message_id]:
+                    if not future.done():
+                        future.set_result(found.get(message_id))
+        logging.info(f"Refreshed {len(ids)} file references in chat {chat_id}")
+
+reference_refresher = ReferenceRefresher()
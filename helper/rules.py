@@ -0,0 +1,102 @@
+import logging
+import re
+
+# Folds runs of dots and whitespace in the same pass
+CLEANUP_PATTERN = re.compile(r"\.{2,}|\s+")
+
+def _cleanup(match):
+    return "." if match.group()[0] == "." else " "
+
+# Separates a pattern from its replacement; plain entries never contain it,
+# so words with ':' or a leading '/' saved before rules existed still remove
+REPLACE_ARROW = "=>"
+
+def parse_rules(text):
+    """Parse the remove_words setting into (pattern, replacement, is_regex) rules
+
+    Rules are separated by commas, or by new lines when the text has several
+    lines. `word` removes the word and `old => new` replaces it. With `=>`,
+    a left side written as `/regex/` is a regular expression, so
+    `/regex/ =>` removes and `/regex/ => new` replaces its matches.
+    """
+    if not text:
+        return []
+    entries = text.splitlines() if "\n" in text else text.split(",")
+
+    rules = []
+    for entry in entries:
+        entry = entry.strip()
+        if not entry:
+            continue
+        if REPLACE_ARROW not in entry:
+            rules.append((entry, "", False))
+            continue
+        old, new = entry.split(REPLACE_ARROW, 1)
+        old, new = old.strip(), new.strip()
+        if len(old) > 2 and old.startswith("/") and old.endswith("/"):
+            rules.append((old[1:-1], new, True))
+        elif old:
+            rules.append((old, new, False))
+    return rules
+
+class CompiledRules:
+    """Remove and replace rules compiled once per settings change
+
+    Literal rules are joined into one alternation of named groups, the group
+    that matched tells which replacement to use; they are tried longest first
+    so a short word never cuts into a longer one. Regex rules then run as
+    separate passes in the order given, so their group numbers,
+    backreferences and lookarounds behave as in a plain re.sub.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.replacements = {}
+        self.regexes = []
+
+        literals = []
+        for pattern, replacement, is_regex in parse_rules(text):
+            if is_regex:
+                try:
+                    self.regexes.append((re.compile(pattern), replacement))
+                except re.error as e:
+                    logging.error(f"Skipping invalid rule /{pattern}/: {e}")
+            else:
+                literals.append((pattern, replacement))
+        literals.sort(key=lambda rule: len(rule[0]), reverse=True)
+
+        alternatives = []
+        for i, (word, replacement) in enumerate(literals):
+            name = f"l{i}"
+            alternatives.append(f"(?P<{name}>{re.escape(word)})")
+            self.replacements[name] = replacement
+        self.pattern = re.compile("|".join(alternatives)) if alternatives else None
+
+    def _replace(self, match):
+        return self.replacements[match.lastgroup]
+
+    def apply(self, filename):
+        """Apply the literal rules in one pass, then each regex rule, and tidy dots and spaces"""
+        if self.pattern is not None:
+            filename = self.pattern.sub(self._replace, filename)
+        for compiled, replacement in self.regexes:
+            try:
+                filename = compiled.sub(replacement, filename)
+            except re.error as e:
+                # A replacement referring to a group the pattern does not have
+                logging.error(f"Skipping rule /{compiled.pattern}/ => {replacement}: {e}")
+        return CLEANUP_PATTERN.sub(_cleanup, filename).strip()
+
+# Compiled rules per user, invalidated by set_remove_words
+_rules_cache = {}
+
+def get_compiled_rules(user_id, text):
+    """Return the user's compiled rules, recompiling only when they changed"""
+    cached = _rules_cache.get(user_id)
+    if cached is None or cached.text != (text or ""):
+        cached = CompiledRules(text or "")
+        _rules_cache[user_id] = cached
+    return cached
+
+def invalidate_rules(user_id):
+    _rules_cache.pop(user_id, None)
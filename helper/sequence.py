@@ -0,0 +1,62 @@
+import asyncio
+import re
+from contextlib import asynccontextmanager
+from helper.series import group_by_series
+from helper.template import extract_fields
+
+NATURAL_SPLIT = re.compile(r"(\d+)")
+
+def natural_key(text):
+    """Sort key comparing digit runs as numbers, so Ep 2 comes before Ep 10"""
+    return [int(part) if part.isdigit() else part.lower() for part in NATURAL_SPLIT.split(text)]
+
+def sequence_key(filename):
+    """Order files by extracted season and episode, then naturally by name"""
+    fields = extract_fields(filename)
+    return (
+        int(fields['season'] or 0),
+        int(fields['episode'] or 0),
+        natural_key(filename),
+    )
+
+def order_by_series(filenames):
+    """Return (series title, indices) per series, each sorted by season and episode
+
+    Series follow each other alphabetically, so files of several shows sent
+    together are not interleaved.
+    """
+    keys = [sequence_key(filename) for filename in filenames]
+    groups = sorted(group_by_series(filenames), key=lambda group: natural_key(group['title']))
+    return [
+        (group['title'], sorted(group['indices'], key=lambda i: keys[i]))
+        for group in groups
+    ]
+
+class OrderedDelivery:
+    """Reorder buffer letting jobs finish in any order but send in sequence
+
+    A job enters turn(index) right before sending; it waits until every
+    earlier index has been sent or skipped. Jobs that fail before sending
+    must call complete(index) so later files are not held back.
+    """
+
+    def __init__(self):
+        self.next_index = 0
+        self.done = set()
+        self.condition = asyncio.Condition()
+
+    async def complete(self, index):
+        async with self.condition:
+            self.done.add(index)
+            while self.next_index in self.done:
+                self.next_index += 1
+            self.condition.notify_all()
+
+    @asynccontextmanager
+    async def turn(self, index):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.next_index >= index)
+        try:
+            yield
+        finally:
+            await self.complete(index)
@@ -0,0 +1,95 @@
+import os
+import re
+from collections import Counter
+
+# Release group tags and other bracketed noise
+BRACKETS = re.compile(r"\[[^\]]*\]|\([^)]*\)|\{[^}]*\}")
+SEPARATORS = re.compile(r"[\s._]+")
+# Leading site or channel tags such as "www.Site.com - " or "@Channel "
+SITE_PREFIX = re.compile(r"^(?:(?:www\.)?[\w-]+\.(?:com|org|net|in|me|co|to|cc|tv)\b|@\w+)\s*-?\s*", re.IGNORECASE)
+# The title ends where the episode, season, year or quality starts
+TITLE_END = re.compile(
+    r"\bS\d{1,2}[\s-]?E\d{1,4}"
+    r"|\bS\d{1,2}\b"
+    r"|\bSeason\s*\d"
+    r"|\b\d{1,2}x\d{2,3}\b"
+    r"|\bEp(?:isode)?\s*\d{1,4}\b"
+    r"|\bE\d{1,4}\b"
+    r"|\s-\s\d{1,4}(?:v\d)?\b"
+    r"|\b(?:19|20)\d{2}\b"
+    r"|\b(?:2160p|1440p|1080p|720p|576p|480p|360p|4K)\b",
+    re.IGNORECASE
+)
+NON_WORD = re.compile(r"[^0-9a-z]+")
+# Words that say nothing about which series a file belongs to
+STOPWORDS = frozenset({'the', 'a', 'an', 'of', 'and', 'to', 'no', 'wa', 'ga', 'season', 'part', 'final'})
+
+def normalize_title(filename):
+    """Return (display title, normalized key) of the series a filename belongs to"""
+    name = SITE_PREFIX.sub("", os.path.splitext(filename)[0])
+    name = SEPARATORS.sub(" ", BRACKETS.sub(" ", name)).strip()
+    # A marker at the very start (a title like 1917) cannot end the title
+    end = next((m.start() for m in TITLE_END.finditer(name) if m.start() > 0), len(name))
+    title = name[:end]
+    title = title.strip(" -")
+    key = NON_WORD.sub(" ", title.lower()).strip()
+    return title, key
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def group_by_series(filenames, threshold=0.6):
+    """Cluster filenames by series title
+
+    Files with the same normalized title are grouped in one dict pass. The
+    distinct titles are then merged through a token index: each title is
+    only compared with clusters sharing one of its two rarest tokens, so the
+    work stays near linear in the number of files. Returns groups in order
+    of first appearance as {'title', 'key', 'indices', 'filenames'}, indices
+    pointing into filenames.
+    """
+    by_key = {}
+    titles = {}
+    for i, filename in enumerate(filenames):
+        title, key = normalize_title(filename)
+        by_key.setdefault(key, []).append(i)
+        titles.setdefault(key, title)
+
+    tokens = {key: frozenset(t for t in key.split() if t not in STOPWORDS) or frozenset(key.split())
+              for key in by_key}
+    frequency = Counter(token for key_tokens in tokens.values() for token in key_tokens)
+
+    clusters = []        # [tokens of the first title, [keys]]
+    index = {}           # token -> cluster ids containing it
+    for key in by_key:
+        key_tokens = tokens[key]
+        rarest = sorted(key_tokens, key=lambda t: (frequency[t], t))[:2]
+        candidates = set()
+        for token in rarest:
+            candidates.update(index.get(token, ()))
+
+        best, best_score = None, threshold
+        for cluster_id in candidates:
+            score = _similarity(key_tokens, clusters[cluster_id][0])
+            if score >= best_score:
+                best, best_score = cluster_id, score
+
+        if best is None:
+            best = len(clusters)
+            clusters.append([key_tokens, []])
+            for token in key_tokens:
+                index.setdefault(token, set()).add(best)
+        clusters[best][1].append(key)
+
+    groups = []
+    for _, keys in clusters:
+        indices = sorted(i for key in keys for i in by_key[key])
+        groups.append({
+            'title': titles[keys[0]],
+            'key': keys[0],
+            'indices': indices,
+            'filenames': [filenames[i] for i in indices],
+        })
+    return groups
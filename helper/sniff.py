@@ -0,0 +1,154 @@
+import logging
+import struct
+from pyrogram.errors import FileReferenceExpired
+from helper.refresh import reference_refresher
+
+# stream_media yields the file in 1 MiB chunks, one chunk is plenty for sniffing
+SNIFF_CHUNKS = 1
+
+VIDEO_EXTENSIONS = ['mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv', 'webm', 'm4v', '3gp', 'ogv']
+AUDIO_EXTENSIONS = ['mp3', 'wav', 'flac', 'aac', 'ogg', 'm4a', 'wma', 'opus']
+
+# Containers Telegram clients can play inline without a remux
+STREAMABLE_CONTAINERS = {'mp4', 'mov', 'm4v'}
+
+CONTAINER_KINDS = {
+    'mp4': 'video', 'mov': 'video', 'm4v': 'video', '3gp': 'video',
+    'mkv': 'video', 'webm': 'video', 'avi': 'video', 'flv': 'video',
+    'ts': 'video', 'asf': 'video', 'ogv': 'video',
+    'm4a': 'audio', 'mp3': 'audio', 'flac': 'audio', 'wav': 'audio',
+    'aac': 'audio', 'ogg': 'audio', 'opus': 'audio',
+}
+
+def detect_container(head):
+    """Detect the container format from the first bytes of a file"""
+    if len(head) < 12:
+        return None
+
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand in (b'M4A ', b'M4B ', b'M4P '):
+            return 'm4a'
+        if brand == b'qt  ':
+            return 'mov'
+        if brand == b'M4V ':
+            return 'm4v'
+        if brand.startswith(b'3g'):
+            return '3gp'
+        return 'mp4'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        # EBML header, the DocType element tells WebM apart from Matroska
+        return 'webm' if b'webm' in head[:64] else 'mkv'
+    if head[:4] == b'RIFF':
+        if head[8:12] == b'AVI ':
+            return 'avi'
+        if head[8:12] == b'WAVE':
+            return 'wav'
+    if head[:3] == b'FLV':
+        return 'flv'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'OggS':
+        if b'OpusHead' in head[:128]:
+            return 'opus'
+        if b'theora' in head[:128]:
+            return 'ogv'
+        return 'ogg'
+    if head[:8] == b'\x30\x26\xb2\x75\x8e\x66\xcf\x11':
+        return 'asf'
+    if head[0] == 0x47 and len(head) > 376 and head[188] == 0x47 and head[376] == 0x47:
+        return 'ts'
+    if head[:3] == b'ID3':
+        return 'mp3'
+    if head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+        return 'aac'
+    if head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return 'mp3'
+    return None
+
+def mp4_is_faststart(head):
+    """Walk the top-level MP4 boxes and report whether moov comes before mdat.
+
+    Returns None when neither box is reached inside the sniffed bytes.
+    """
+    pos = 0
+    while pos + 8 <= len(head):
+        size, box_type = struct.unpack('>I4s', head[pos:pos + 8])
+        if size == 1:
+            if pos + 16 > len(head):
+                return None
+            size = struct.unpack('>Q', head[pos + 8:pos + 16])[0]
+        if box_type == b'moov':
+            return True
+        if box_type == b'mdat':
+            return False
+        if size < 8:
+            # size 0 means "until end of file", nothing after it
+            return None
+        pos += size
+    return None
+
+def sniff_header(head):
+    """Build a sniff result from the first bytes of a file"""
+    container = detect_container(head)
+    kind = CONTAINER_KINDS.get(container, 'document')
+    faststart = None
+    if container in ('mp4', 'mov', 'm4v', 'm4a', '3gp'):
+        faststart = mp4_is_faststart(head)
+
+    return {
+        'container': container,
+        'kind': kind,
+        'faststart': faststart,
+        # Only videos sent as media need a playable MP4 with moov up front
+        'needs_remux': kind == 'video' and (
+            container not in STREAMABLE_CONTAINERS or faststart is False
+        ),
+    }
+
+async def sniff_message(client, message):
+    """Read only the first chunk of a Telegram file and sniff its container"""
+    try:
+        head = b""
+        try:
+            async for chunk in client.stream_media(message, limit=SNIFF_CHUNKS):
+                head += chunk
+                break
+        except FileReferenceExpired:
+            message = await reference_refresher.refresh(client, message)
+            async for chunk in client.stream_media(message, limit=SNIFF_CHUNKS):
+                head += chunk
+                break
+        return sniff_header(head)
+    except Exception as e:
+        logging.error(f"Sniff error: {e}")
+        return None
+
+def sniff_file(path):
+    """Sniff a file that is already on disk, reading as much as sniff_message does"""
+    try:
+        with open(path, 'rb') as f:
+            return sniff_header(f.read(SNIFF_CHUNKS * 1024 * 1024))
+    except Exception as e:
+        logging.error(f"Sniff error: {e}")
+        return None
+
+def choose_send_path(sniff, send_as, filename):
+    """Decide between document, video and audio upload
+
+    The sniffed container wins over the extension, which is only used when
+    the header could not be recognised.
+    """
+    if send_as == 'DOCUMENT':
+        return 'document'
+
+    kind = sniff.get('kind') if sniff and sniff.get('container') else None
+    if kind is None:
+        file_ext = filename.lower().split('.')[-1]
+        if file_ext in VIDEO_EXTENSIONS:
+            kind = 'video'
+        elif file_ext in AUDIO_EXTENSIONS:
+            kind = 'audio'
+        else:
+            kind = 'document'
+    return kind
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import math
+import os
+from config import Config
+from helper.media import run_ffmpeg, probe_duration
+
+# Leave headroom under the limit, segments only cut on keyframes
+SPLIT_TARGET_RATIO = 0.9
+MAX_SPLIT_RETRIES = 3
+
+def plan_split(file_size, limit=None):
+    """Decide at admission time how many parts a file needs, 1 means no split"""
+    limit = limit or Config.MAX_FILE_SIZE
+    if not file_size or file_size <= limit:
+        return 1
+    return math.ceil(file_size / (limit * SPLIT_TARGET_RATIO))
+
+def build_segment_command(src, pattern, segment_time):
+    """Cut at keyframes with the segment muxer, stream copy only"""
+    return [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error', '-y',
+        '-i', src,
+        '-map', '0', '-c', 'copy',
+        '-f', 'segment',
+        '-segment_time', f"{segment_time:.3f}",
+        '-reset_timestamps', '1',
+        pattern,
+    ]
+
+def segment_pattern(out_dir, name, ext):
+    """Output pattern of the segment muxer, % in user file names is escaped"""
+    base = os.path.join(out_dir, name).replace('%', '%%')
+    return f"{base}.part%03d{ext.replace('%', '%%')}"
+
+def segment_outputs(out_dir, name, ext):
+    """Parts the segment muxer wrote, in order
+
+    Exact names are checked rather than globbed, so brackets or * in the
+    file name cannot match other files.
+    """
+    outputs = []
+    while True:
+        path = os.path.join(out_dir, f"{name}.part{len(outputs):03d}{ext}")
+        if not os.path.exists(path):
+            return outputs
+        outputs.append(path)
+
+def split_bytes(src, out_dir, part_size):
+    """Split any file into name.ext.001, name.ext.002, ... byte ranges"""
+    base = os.path.join(out_dir, os.path.basename(src))
+    parts = []
+    with open(src, 'rb') as f:
+        index = 1
+        while True:
+            part_path = f"{base}.{index:03d}"
+            written = 0
+            with open(part_path, 'wb') as part:
+                while written < part_size:
+                    chunk = f.read(min(8 * 1024 * 1024, part_size - written))
+                    if not chunk:
+                        break
+                    part.write(chunk)
+                    written += len(chunk)
+            if not written:
+                os.remove(part_path)
+                break
+            parts.append(part_path)
+            index += 1
+    return parts
+
+async def split_video(src, out_dir, parts, total_duration=0, job_id=None):
+    """Split a video into playable parts below the size limit, None on failure"""
+    total_duration = total_duration or await probe_duration(src, job_id)
+    if not total_duration:
+        return None
+
+    name, ext = os.path.splitext(os.path.basename(src))
+    for attempt in range(MAX_SPLIT_RETRIES):
+        returncode, stderr = await run_ffmpeg(
+            build_segment_command(src, segment_pattern(out_dir, name, ext), total_duration / parts), job_id
+        )
+        outputs = segment_outputs(out_dir, name, ext)
+        if returncode == 0 and outputs and all(os.path.getsize(p) <= Config.MAX_FILE_SIZE for p in outputs):
+            return outputs
+        for path in outputs:
+            os.remove(path)
+        if returncode != 0:
+            logging.error(f"Segment split failed: {stderr.strip()[-500:]}")
+            return None
+        # Sparse keyframes made a part too big, cut shorter segments
+        parts += 1
+    return None
+
+async def split_output(src, out_dir, parts, is_video=False, total_duration=0, job_id=None):
+    """Split an oversized output, at keyframes for videos and by bytes otherwise"""
+    if is_video:
+        outputs = await split_video(src, out_dir, parts, total_duration, job_id)
+        if outputs:
+            return outputs, True
+        logging.info(f"Falling back to byte split for {src}")
+    part_size = math.ceil(os.path.getsize(src) / parts)
+    return await asyncio.to_thread(split_bytes, src, out_dir, part_size), False
@@ -0,0 +1,126 @@
+import os
+import re
+
+# Extraction patterns, compiled once at import. Alternatives are tried left
+# to right so the most specific notation wins.
+SEASON_PATTERN = re.compile(
+    r"\bS(\d{1,2})[\s._-]?E\d{1,4}"
+    r"|\bSeason[\s._-]*(\d{1,2})"
+    r"|\b(\d{1,2})x\d{2,3}\b"
+    r"|\bS(\d{1,2})\b",
+    re.IGNORECASE
+)
+EPISODE_PATTERN = re.compile(
+    r"\bS\d{1,2}[\s._-]?E(\d{1,4})"
+    r"|\b\d{1,2}x(\d{2,3})\b"
+    r"|\bEp(?:isode)?[\s._-]*(\d{1,4})"
+    r"|\bE(\d{1,4})\b"
+    r"|\s-\s(\d{1,4})(?:v\d)?(?=[\s._\[(]|$)"
+    r"|\[(\d{1,4})(?:v\d)?\]",
+    re.IGNORECASE
+)
+QUALITY_PATTERN = re.compile(
+    r"\b(2160p|1440p|1080p|720p|576p|480p|360p|240p|4K|UHD|FHD|HD|SD)\b",
+    re.IGNORECASE
+)
+CODEC_PATTERN = re.compile(
+    r"\b(x264|x265|h\.?264|h\.?265|HEVC|AVC|AV1|VP9|XviD|DivX)\b",
+    re.IGNORECASE
+)
+LANGUAGE_PATTERN = re.compile(
+    r"\b(Dual[\s._-]?Audio|Multi[\s._-]?Audio|Multi|English|Eng|Japanese|Jap|Hindi|Hin|"
+    r"Tamil|Telugu|Korean|Kor|Chinese|Spanish|French|German|Italian|Russian|Arabic|"
+    r"Dubbed|Dub|Subbed|Sub|ESub)\b",
+    re.IGNORECASE
+)
+
+QUALITY_ALIASES = {'4k': '2160p', 'uhd': '2160p', 'fhd': '1080p', 'hd': '720p', 'sd': '480p'}
+CODEC_ALIASES = {'h264': 'x264', 'h.264': 'x264', 'avc': 'x264', 'h265': 'x265', 'h.265': 'x265', 'hevc': 'x265'}
+
+TEMPLATE_FIELDS = ('episode', 'season', 'quality', 'codec', 'language', 'filename')
+# [episode], {episode}, [EPISODE] and {Episode} are all the same placeholder
+PLACEHOLDER_PATTERN = re.compile(
+    r"\[(" + "|".join(TEMPLATE_FIELDS) + r")\]|\{(" + "|".join(TEMPLATE_FIELDS) + r")\}",
+    re.IGNORECASE
+)
+
+def _first_group(pattern, text):
+    match = pattern.search(text)
+    if not match:
+        return None
+    return next(group for group in match.groups() if group is not None)
+
+def extract_fields(filename):
+    """Extract season, episode, quality, codec and language from a filename"""
+    stem = os.path.splitext(filename)[0]
+    season = _first_group(SEASON_PATTERN, stem)
+    episode = _first_group(EPISODE_PATTERN, stem)
+    quality = _first_group(QUALITY_PATTERN, stem)
+    codec = _first_group(CODEC_PATTERN, stem)
+    language = _first_group(LANGUAGE_PATTERN, stem)
+
+    if quality:
+        quality = QUALITY_ALIASES.get(quality.lower(), quality.lower())
+    if codec:
+        codec = CODEC_ALIASES.get(codec.lower(), codec.lower())
+    if language:
+        language = re.sub(r"[\s._-]+", " ", language)
+    return {
+        'season': f"{int(season):02d}" if season else None,
+        'episode': f"{int(episode):02d}" if episode else None,
+        'quality': quality,
+        'codec': codec,
+        'language': language,
+        'filename': stem,
+    }
+
+class CompiledTemplate:
+    """A format_template split once into literal text and field slots"""
+
+    def __init__(self, template):
+        self.template = template
+        self.parts = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(template):
+            if match.start() > position:
+                self.parts.append((False, template[position:match.start()]))
+            self.parts.append((True, (match.group(1) or match.group(2)).lower()))
+            position = match.end()
+        if position < len(template):
+            self.parts.append((False, template[position:]))
+        self.fields = {value for is_field, value in self.parts if is_field}
+
+    def render(self, filename, fields=None):
+        """Render the template for filename, keeping its extension
+
+        Returns None when the file lacks a field the template uses or the
+        name comes out empty, so the caller can keep the name it had.
+        """
+        fields = fields or extract_fields(filename)
+        if any(not fields.get(field) for field in self.fields):
+            return None
+        name = "".join(fields[value] if is_field else value for is_field, value in self.parts)
+        name = re.sub(r"\s+", " ", name).strip(" -_.")
+        if not name:
+            return None
+
+        ext = os.path.splitext(filename)[1]
+        if ext and not name.lower().endswith(ext.lower()):
+            name += ext
+        return name
+
+# Compiled templates per user, invalidated by set_format_template
+_template_cache = {}
+
+def get_compiled_template(user_id, template):
+    """Return the user's compiled template, recompiling only when it changed"""
+    if not template:
+        return None
+    cached = _template_cache.get(user_id)
+    if cached is None or cached.template != template:
+        cached = CompiledTemplate(template)
+        _template_cache[user_id] = cached
+    return cached
+
+def invalidate_template(user_id):
+    _template_cache.pop(user_id, None)
@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import logging
+import os
+from PIL import Image
+from config import Config
+from helper.media import build_screenshot_command, run_ffmpeg, probe_duration
+
+# Telegram rejects thumbnails above 320px per side or 200 KB
+THUMB_MAX_SIZE = (320, 320)
+THUMB_MAX_BYTES = 200 * 1024
+THUMB_CACHE_DIR = os.path.join(Config.DOWNLOAD_LOCATION, "thumbs")
+# Cached thumbnails kept on disk, the least recently used go first
+THUMB_CACHE_MAX_FILES = 2000
+
+def fit_thumbnail(src, dst):
+    """Resize an image to Telegram's thumbnail limits and save it as JPEG"""
+    with Image.open(src) as image:
+        image = image.convert("RGB")
+        image.thumbnail(THUMB_MAX_SIZE)
+        quality = 90
+        while True:
+            image.save(dst, "JPEG", quality=quality, optimize=True)
+            if os.path.getsize(dst) <= THUMB_MAX_BYTES or quality <= 30:
+                break
+            quality -= 15
+    return dst
+
+def touch_cached(path):
+    """Mark a cached thumbnail as used, returns False when it is not cached"""
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+def prune_thumb_cache(max_files=THUMB_CACHE_MAX_FILES):
+    """Delete the least recently used thumbnails beyond max_files"""
+    try:
+        entries = [entry for entry in os.scandir(THUMB_CACHE_DIR)
+                   if entry.is_file() and entry.name.endswith(".jpg")]
+        if len(entries) <= max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        # Prune down to 90% so the scan does not run on every new thumbnail
+        for entry in entries[:len(entries) - int(max_files * 0.9)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    except Exception as e:
+        logging.error(f"Thumbnail cache prune error: {e}")
+
+async def get_user_thumbnail(client, file_id):
+    """Download the user's thumbnail once and keep a fitted copy on disk"""
+    os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+    key = hashlib.md5(file_id.encode()).hexdigest()
+    path = os.path.join(THUMB_CACHE_DIR, f"user_{key}.jpg")
+    if touch_cached(path):
+        return path
+    raw = await client.download_media(file_id, file_name=f"{path}.raw")
+    await asyncio.to_thread(fit_thumbnail, raw, path)
+    os.remove(raw)
+    await asyncio.to_thread(prune_thumb_cache)
+    return path
+
+async def extract_thumbnail(media_path, file_unique_id, total_duration=0, job_id=None):
+    """Grab a representative frame with one fast seek, cached by file_unique_id
+
+    The frame comes from the already downloaded file, so nothing is fetched
+    from Telegram again and repeat renames of the same file skip ffmpeg.
+    """
+    os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+    path = os.path.join(THUMB_CACHE_DIR, f"{file_unique_id}.jpg")
+    if touch_cached(path):
+        return path
+
+    total_duration = total_duration or await probe_duration(media_path, job_id)
+    # Skip intros and black opening frames
+    timestamp = total_duration * 0.1 if total_duration else 0
+    frame = f"{path}.frame.jpg"
+    returncode, stderr = await run_ffmpeg(
+        build_screenshot_command(media_path, frame, timestamp), job_id, timeout=120
+    )
+    if returncode != 0 or not os.path.exists(frame):
+        logging.error(f"Thumbnail extraction failed: {stderr.strip()[-500:]}")
+        return None
+    try:
+        await asyncio.to_thread(fit_thumbnail, frame, path)
+    finally:
+        os.remove(frame)
+    await asyncio.to_thread(prune_thumb_cache)
+    return path
+
+async def prepare_thumbnail(client, thumb_file_id, media_path=None, file_unique_id=None,
+                            is_video=False, total_duration=0, job_id=None):
+    """Return a local thumbnail path: the user's own, else one extracted from the video"""
+    try:
+        if thumb_file_id:
+            return await get_user_thumbnail(client, thumb_file_id)
+        if is_video and media_path and file_unique_id:
+            return await extract_thumbnail(media_path, file_unique_id, total_duration, job_id)
+    except Exception as e:
+        logging.error(f"Thumbnail preparation error: {e}")
+    return None
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+from pyrogram import raw, utils
+from config import Config
+
+# Telegram accepts at most 10 items per media group
+MEDIA_GROUP_SIZE = 10
+
+async def upload_media(client, chat_id, path, caption="", thumb=None, as_video=False, duration=0,
+                       as_audio=False):
+    """Upload a file to Telegram without sending it yet
+
+    Returns an InputSingleMedia ready to be sent later with send_prepared,
+    which lets several files upload in parallel and still arrive in order.
+    """
+    peer = await client.resolve_peer(chat_id)
+    attributes = [raw.types.DocumentAttributeFilename(file_name=os.path.basename(path))]
+    if as_video:
+        attributes.append(raw.types.DocumentAttributeVideo(
+            duration=int(duration), w=0, h=0, supports_streaming=True
+        ))
+    elif as_audio:
+        attributes.append(raw.types.DocumentAttributeAudio(duration=int(duration)))
+
+    media = await client.invoke(raw.functions.messages.UploadMedia(
+        peer=peer,
+        media=raw.types.InputMediaUploadedDocument(
+            mime_type=client.guess_mime_type(path) or "application/octet-stream",
+            file=await client.save_file(path),
+            thumb=await client.save_file(thumb) if thumb else None,
+            force_file=not (as_video or as_audio),
+            attributes=attributes
+        )
+    ))
+    document = media.document
+    return raw.types.InputSingleMedia(
+        media=raw.types.InputMediaDocument(
+            id=raw.types.InputDocument(
+                id=document.id,
+                access_hash=document.access_hash,
+                file_reference=document.file_reference
+            )
+        ),
+        random_id=client.rnd_id(),
+        **await utils.parse_text_entities(client, caption or "", None, None)
+    )
+
+async def upload_parallel(client, chat_id, items, concurrency=None):
+    """Upload many files at once, keeping the results in input order
+
+    items are dicts with the keyword arguments of upload_media.
+    """
+    semaphore = asyncio.Semaphore(concurrency or Config.PARALLEL_UPLOADS)
+
+    async def upload(item):
+        async with semaphore:
+            return await upload_media(client, chat_id, **item)
+
+    return await asyncio.gather(*(upload(item) for item in items))
+
+async def send_prepared(client, chat_id, prepared, reply_to_message_id=None):
+    """Send uploaded media in order, as albums of up to 10, and return the message ids"""
+    peer = await client.resolve_peer(chat_id)
+    message_ids = []
+    for i in range(0, len(prepared), MEDIA_GROUP_SIZE):
+        batch = prepared[i:i + MEDIA_GROUP_SIZE]
+        if len(batch) == 1:
+            item = batch[0]
+            updates = await client.invoke(raw.functions.messages.SendMedia(
+                peer=peer,
+                media=item.media,
+                message=item.message,
+                entities=item.entities,
+                random_id=item.random_id,
+                reply_to_msg_id=reply_to_message_id
+            ))
+        else:
+            updates = await client.invoke(raw.functions.messages.SendMultiMedia(
+                peer=peer,
+                multi_media=batch,
+                reply_to_msg_id=reply_to_message_id
+            ))
+        message_ids += [
+            update.message.id for update in getattr(updates, 'updates', [])
+            if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage))
+        ]
+    return message_ids
+
+async def deliver_prepared(client, chat_id, message_ids, destination):
+    """Copy sent albums to the upload destination without uploading again"""
+    if not destination or not message_ids:
+        return
+    try:
+        for i in range(0, len(message_ids), MEDIA_GROUP_SIZE):
+            batch = message_ids[i:i + MEDIA_GROUP_SIZE]
+            if len(batch) == 1:
+                await client.copy_message(destination, chat_id, batch[0])
+            else:
+                await client.copy_media_group(destination, chat_id, batch[0])
+    except Exception as e:
+        logging.error(f"Delivery to {destination} failed: {e}")
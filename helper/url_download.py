@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import ipaddress
+import logging
+import os
+import re
+import socket
+import time
+from urllib.parse import unquote, urljoin, urlparse
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from config import Config
+from helper.utils import progress_for_pyrogram
+
+CHUNK_SIZE = 1024 * 1024
+# Ranges smaller than this are not worth their own connection
+MIN_PART_SIZE = 8 * 1024 * 1024
+PART_RETRIES = 3
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+DISPOSITION_NAME = re.compile(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", re.IGNORECASE)
+
+class RangeNotSupported(Exception):
+    """The server ignored a Range request, the file has to be streamed in one piece"""
+
+class BlockedAddress(Exception):
+    """The URL points to a loopback, private or otherwise non-public address"""
+
+class FileTooLarge(Exception):
+    """The download is larger than URL_MAX_SIZE"""
+
+def is_public_address(address):
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+def check_url(url):
+    """Reject non-http(s) URLs and hosts written as a non-public IP address"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise BlockedAddress(f"Unsupported URL: {url}")
+    try:
+        public = is_public_address(parsed.hostname)
+    except ValueError:
+        # A host name, checked by PublicResolver when it is resolved
+        return
+    if not public:
+        raise BlockedAddress(f"Address {parsed.hostname} is not allowed")
+
+class PublicResolver(AbstractResolver):
+    """Resolver refusing host names that resolve to non-public addresses
+
+    Every connection resolves through it, so redirects and DNS answers
+    that change between the probe and the download are covered too.
+    """
+
+    def __init__(self):
+        self.resolver = aiohttp.ThreadedResolver()
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        hosts = await self.resolver.resolve(host, port, family)
+        for entry in hosts:
+            if not is_public_address(entry['host']):
+                raise BlockedAddress(f"{host} resolves to {entry['host']}, which is not allowed")
+        return hosts
+
+    async def close(self):
+        await self.resolver.close()
+
+def open_session(timeout):
+    return aiohttp.ClientSession(timeout=timeout, connector=aiohttp.TCPConnector(resolver=PublicResolver()))
+
+async def request(session, url, headers=None):
+    """GET url following redirects by hand, so every hop is checked"""
+    for _ in range(MAX_REDIRECTS + 1):
+        check_url(url)
+        response = await session.get(url, headers=headers, allow_redirects=False)
+        location = response.headers.get('Location')
+        if response.status not in REDIRECT_STATUSES or not location:
+            return response
+        response.release()
+        url = urljoin(url, location)
+    raise Exception(f"Too many redirects for {url}")
+
+def filename_from_response(url, headers):
+    """File name from Content-Disposition, else from the last part of the URL path"""
+    match = DISPOSITION_NAME.search(headers.get('Content-Disposition', ''))
+    if match:
+        name = unquote(match.group(1))
+    else:
+        name = unquote(os.path.basename(urlparse(url).path))
+    # Never let a remote name escape the download directory
+    return os.path.basename(name.replace('\\', '/')).strip() or "download.bin"
+
+async def probe_url(session, url):
+    """Ask for the first byte to learn size, name and Range support in one request
+
+    The URL after redirects is returned as 'url' and used by the download.
+    """
+    async with await request(session, url, {'Range': 'bytes=0-0'}) as response:
+        response.raise_for_status()
+        url = str(response.url)
+        name = filename_from_response(url, response.headers)
+        match = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+        if response.status == 206 and match and match.group(3) != '*':
+            return {'url': url, 'size': int(match.group(3)), 'ranges': True, 'name': name}
+        size = int(response.headers.get('Content-Length') or 0)
+        return {'url': url, 'size': size, 'ranges': False, 'name': name}
+
+async def _download_part(session, url, path, start, end, progress):
+    """Fetch bytes start..end into the preallocated file, resuming on errors"""
+    position = start
+    for attempt in range(PART_RETRIES + 1):
+        try:
+            async with await request(session, url, {'Range': f"bytes={position}-{end}"}) as response:
+                if response.status != 206:
+                    raise RangeNotSupported(f"Server answered {response.status} to a Range request")
+                match = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+                if not match or int(match.group(1)) != position:
+                    raise RangeNotSupported("Server returned a different range")
+                with open(path, 'r+b') as f:
+                    f.seek(position)
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        chunk = chunk[:end + 1 - position]
+                        f.write(chunk)
+                        position += len(chunk)
+                        await progress(len(chunk))
+                        if position > end:
+                            break
+            if position > end:
+                return
+        except (RangeNotSupported, BlockedAddress, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            if attempt == PART_RETRIES:
+                raise
+            logging.warning(f"Range {position}-{end} of {url} interrupted: {e}, resuming")
+    raise Exception(f"Range {start}-{end} ended early at {position}")
+
+async def _download_ranges(session, url, path, size, parts, progress):
+    with open(path, 'wb') as f:
+        f.truncate(size)
+    part_size = -(-size // parts)
+    tasks = [
+        asyncio.create_task(_download_part(session, url, path, start, min(start + part_size, size) - 1, progress))
+        for start in range(0, size, part_size)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop the other parts before the caller reuses the file or closes the session
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+async def _download_stream(session, url, path, progress, max_size):
+    received = 0
+    async with await request(session, url) as response:
+        response.raise_for_status()
+        expected = int(response.headers.get('Content-Length') or 0)
+        with open(path, 'wb') as f:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                f.write(chunk)
+                received += len(chunk)
+                # Servers without a size are only stopped while streaming
+                if max_size and received > max_size:
+                    raise FileTooLarge(f"Download exceeds {max_size} bytes")
+                await progress(len(chunk))
+    if expected and received != expected:
+        raise Exception(f"Received {received} bytes, expected {expected}")
+    return received
+
+def _sha256_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+async def download_url(url, path, connections=None, progress_msg=None, info=None, max_size=None):
+    """Download url to path over several Range connections
+
+    Falls back to a single stream when the server does not support ranges,
+    does not report a size, or the file is too small to split. Only public
+    addresses are contacted and files above max_size (URL_MAX_SIZE by
+    default) are refused. Returns {'path', 'size', 'sha256', 'connections'}
+    like download_verified.
+    """
+    connections = connections or Config.URL_CONNECTIONS
+    max_size = Config.URL_MAX_SIZE if max_size is None else max_size
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+    state = {'received': 0, 'start': time.time(), 'size': 0}
+
+    async def progress(count):
+        state['received'] += count
+        if progress_msg:
+            await progress_for_pyrogram(
+                state['received'], state['size'] or state['received'],
+                "📥 **Downloading from URL...**", progress_msg, state['start']
+            )
+
+    async with open_session(timeout) as session:
+        info = info or await probe_url(session, url)
+        url = info.get('url', url)
+        size = state['size'] = info['size']
+        if max_size and size > max_size:
+            raise FileTooLarge(f"File is {size} bytes, the limit is {max_size}")
+        parts = min(connections, size // MIN_PART_SIZE) if info['ranges'] else 1
+        if parts > 1:
+            try:
+                await _download_ranges(session, url, path, size, parts, progress)
+            except RangeNotSupported as e:
+                logging.info(f"{e}, downloading {url} as a single stream")
+                state['received'] = 0
+                parts = 1
+        if parts <= 1:
+            parts = 1
+            size = await _download_stream(session, url, path, progress, max_size)
+
+    sha256 = await asyncio.to_thread(_sha256_file, path)
+    logging.info(f"Downloaded {size} bytes from {url} over {parts} connection(s)")
+    return {'path': path, 'size': size, 'sha256': sha256, 'connections': parts}
+
+class UrlSource:
+    """A rename job input fetched over HTTP instead of from a Telegram message"""
+
+    def __init__(self, url, info):
+        self.url = url
+        self.info = info
+        self.name = info['name']
+        self.size = info['size']
+
+    @classmethod
+    async def open(cls, url):
+        """Probe the URL once, the result is reused by the download"""
+        timeout = aiohttp.ClientTimeout(total=60)
+        async with open_session(timeout) as session:
+            return cls(url, await probe_url(session, url))
+
+    async def download(self, path, progress_msg=None):
+        return await download_url(self.url, path, progress_msg=progress_msg, info=self.info)
@@ -7,10 +7,30 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 import re
 
 
+# Seconds between progress edits of one message, faster edits get FloodWait
+PROGRESS_INTERVAL = 5
+# Time of the last progress edit per (chat id, message id)
+last_progress_edit = {}
+
+def should_edit_progress(message, now, done):
+    """Throttle progress edits by time, the final one always goes out"""
+    key = (getattr(getattr(message, 'chat', None), 'id', None), getattr(message, 'id', None))
+    if done:
+        last_progress_edit.pop(key, None)
+        return True
+    if now - last_progress_edit.get(key, 0) < PROGRESS_INTERVAL:
+        return False
+    # Forget messages whose transfer stopped before completing
+    if len(last_progress_edit) > 1000:
+        for stale in [k for k, edited in last_progress_edit.items() if now - edited > 3600]:
+            del last_progress_edit[stale]
+    last_progress_edit[key] = now
+    return True
+
 async def progress_for_pyrogram(current, total, ud_type, message, start):
     now = time.time()
     diff = now - start
-    if round(diff % 5.00) == 0 or current == total:        
+    if should_edit_progress(message, now, current == total):
         percentage = current * 100 / total
         speed = current / diff
         elapsed_time = round(diff) * 1000
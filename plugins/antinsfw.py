@@ -1,37 +1,53 @@
-import aiohttp
-import logging
+import asyncio
+import os
+import tempfile
+from pyrogram import Client, filters
+from pyrogram.types import Message
 from config import Config
+from helper.database import DARKXSIDE78
+from helper.nsfw import get_nsfw_index, reset_nsfw_index, verdict_cache
+from helper.phash import phash
 
-async def check_anti_nsfw(file_path: str) -> bool:
-    """
-    Check if a file contains NSFW content
-    Returns True if NSFW, False if safe
-    """
-    if not Config.ANTI_NSFW_ENABLED:
-        return False
-    
-    try:
-        # This is a placeholder implementation
-        # In a real scenario, you would integrate with an NSFW detection API
-        # For now, we'll return False (safe) for all files
-        
-        # Example implementation with an NSFW detection service:
-        # async with aiohttp.ClientSession() as session:
-        #     with open(file_path, 'rb') as f:
-        #         data = aiohttp.FormData()
-        #         data.add_field('file', f)
-        #         async with session.post('https://nsfw-api.example.com/check', data=data) as response:
-        #             result = await response.json()
-        #             return result.get('is_nsfw', False)
-        
-        return False
-    
-    except Exception as e:
-        logging.error(f"NSFW check failed: {e}")
-        return False  # Default to safe if check fails
+async def hash_replied_media(client, message: Message):
+    """Perceptual hash of the photo, or of the video/document thumbnail, replied to"""
+    target = message.reply_to_message
+    if not target:
+        return None
+    if target.photo:
+        file_id = target.photo.file_id
+    else:
+        media = target.video or target.document or target.animation
+        if not media or not media.thumbs:
+            return None
+        file_id = media.thumbs[-1].file_id
 
-async def is_nsfw_content(file_path: str) -> bool:
-    """
-    Alias for check_anti_nsfw for compatibility
-    """
-    return await check_anti_nsfw(file_path)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = await client.download_media(file_id, file_name=os.path.join(temp_dir, "image.jpg"))
+        return await asyncio.to_thread(phash, path)
+
+@Client.on_message(filters.command("banhash") & filters.user(Config.ADMIN))
+async def ban_hash(client, message: Message):
+    value = await hash_replied_media(client, message)
+    if value is None:
+        return await message.reply_text("Reply to a photo, or a video/document with a thumbnail.")
+    await DARKXSIDE78.add_nsfw_hash(value, message.from_user.id)
+    (await get_nsfw_index()).add(value)
+    verdict_cache.clear()
+    await message.reply_text(f"✅ Banned hash `{value:016x}`")
+
+@Client.on_message(filters.command("unbanhash") & filters.user(Config.ADMIN))
+async def unban_hash(client, message: Message):
+    if len(message.command) > 1:
+        try:
+            value = int(message.command[1], 16)
+        except ValueError:
+            return await message.reply_text("Usage: /unbanhash <hash> or reply to the media")
+    else:
+        value = await hash_replied_media(client, message)
+    if value is None:
+        return await message.reply_text("Usage: /unbanhash <hash> or reply to the media")
+    if not await DARKXSIDE78.remove_nsfw_hash(value):
+        return await message.reply_text("Hash not found.")
+    # Rebuilt from the database on next use
+    reset_nsfw_index()
+    await message.reply_text(f"✅ Unbanned hash `{value:016x}`")
@@ -1,27 +1,30 @@
-import asyncio
 import logging
-import math
-import os
-import re
 from pyrogram import Client, filters
 from pyrogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup
 from helper.database import DARKXSIDE78
-
-def get_readable_file_size(size_bytes):
-    """Convert bytes to readable format"""
-    if size_bytes == 0:
-        return "0B"
-    size_name = ["B", "KB", "MB", "GB", "TB"]
-    i = int(math.floor(math.log(size_bytes, 1024)))
-    p = math.pow(1024, i)
-    s = round(size_bytes / p, 2)
-    return f"{s} {size_name[i]}"
+from helper.pipeline import run_rename_job
+from helper.template import get_compiled_template
+from helper.rules import get_compiled_rules
+from helper.naming import process_filename_auto
 
 @Client.on_message(filters.private & filters.command("autorename"))
 async def auto_rename_command(client, message: Message):
     """Auto rename command handler"""
     user_id = message.from_user.id
+    
+    # /autorename <template> stores the format template
+    if len(message.command) > 1:
+        template = message.text.split(" ", 1)[1].strip()
+        await DARKXSIDE78.set_format_template(user_id, template)
+        await message.reply_text(
+            f"✅ **Auto rename template saved**\n\n"
+            f"**Template:** `{template}`\n\n"
+            f"Variables: `[episode]` `[season]` `[quality]` `[codec]` `[language]` `[filename]`"
+        )
+        return
+    
     settings = await DARKXSIDE78.get_user_settings(user_id)
+    template = await DARKXSIDE78.get_format_template(user_id)
     
     # Check if Manual Mode is active
     if settings.get('rename_mode') == "Manual":
@@ -38,6 +41,7 @@ async def auto_rename_command(client, message: Message):
     text = f"""**🔄 Auto Rename Configuration**
 
 Current Mode: **{settings.get('rename_mode', 'Manual')}**
+Template: `{template or 'None'}`
 
 Choose auto rename options:"""
     
@@ -109,12 +113,10 @@ async def handle_auto_rename(client, message: Message):
             return False
         
         # Get user settings
-        prefix = await DARKXSIDE78.get_prefix(user_id) or ""
-        suffix = await DARKXSIDE78.get_suffix(user_id) or ""
-        remove_words = await DARKXSIDE78.get_remove_words(user_id) or ""
+        name_settings = await get_name_settings(user_id)
         
         # Process filename
-        new_name = process_filename_auto(file_name, prefix, suffix, remove_words)
+        new_name = process_filename_auto(file_name, *name_settings)
         
         if new_name != file_name:
             # Show auto rename result
@@ -127,8 +129,8 @@ Processing file..."""
             
             status_msg = await message.reply_text(text)
             
-            # Apply the rename and upload
-            success = await rename_and_upload_file(client, message, new_name)
+            # Apply the rename and upload, reusing the status message for progress
+            success = await rename_and_upload_file(client, message, new_name, status_msg)
             
             if success:
                 await status_msg.edit_text(
@@ -146,122 +148,15 @@ Processing file..."""
         logging.error(f"Auto rename error: {e}")
         return False
 
-def process_filename_auto(filename, prefix="", suffix="", remove_words=""):
-    """Process filename with auto rename settings"""
-    try:
-        # Remove unwanted words
-        if remove_words:
-            words_to_remove = [word.strip() for word in remove_words.split(',')]
-            for word in words_to_remove:
-                if word:
-                    filename = filename.replace(word, "")
-        
-        # Clean up multiple spaces and dots
-        filename = re.sub(r'\.+', '.', filename)
-        filename = re.sub(r'\s+', ' ', filename)
-        filename = filename.strip()
-        
-        # Split filename and extension
-        name, ext = os.path.splitext(filename)
-        
-        # Add prefix and suffix
-        if prefix:
-            name = f"{prefix} {name}"
-        if suffix:
-            name = f"{name} {suffix}"
-        
-        # Clean up again
-        name = name.strip()
-        
-        return f"{name}{ext}"
-        
-    except Exception as e:
-        logging.error(f"Error processing filename: {e}")
-        return filename
+async def get_name_settings(user_id):
+    """Prefix, suffix, compiled rules and compiled template for process_filename_auto"""
+    return (
+        await DARKXSIDE78.get_prefix(user_id) or "",
+        await DARKXSIDE78.get_suffix(user_id) or "",
+        get_compiled_rules(user_id, await DARKXSIDE78.get_remove_words(user_id)),
+        get_compiled_template(user_id, await DARKXSIDE78.get_format_template(user_id)),
+    )
 
-async def rename_and_upload_file(client, message: Message, new_filename):
+async def rename_and_upload_file(client, message: Message, new_filename, progress_msg=None):
     """Rename and upload file with progress tracking"""
-    try:
-        user_id = message.from_user.id
-        
-        # Show downloading status
-        progress_msg = await message.reply_text("📥 **Downloading file...**")
-        
-        # Download file
-        file_path = await message.download()
-        
-        # Update status
-        await progress_msg.edit_text("🔄 **Renaming file...**")
-        
-        # Create new file path with new name
-        directory = os.path.dirname(file_path)
-        new_file_path = os.path.join(directory, new_filename)
-        
-        # Rename file
-        os.rename(file_path, new_file_path)
-        
-        # Update status
-        await progress_msg.edit_text("📤 **Uploading file...**")
-        
-        # Get user settings for upload
-        settings = await DARKXSIDE78.get_user_settings(user_id)
-        thumbnail = await DARKXSIDE78.get_thumbnail(user_id)
-        caption = await DARKXSIDE78.get_caption(user_id)
-        
-        # Prepare caption
-        final_caption = caption or new_filename
-        
-        # Upload based on file type and settings
-        if message.document:
-            if settings.get('send_as') == 'media' and new_filename.lower().endswith(('.mp4', '.avi', '.mkv', '.mov')):
-                await client.send_video(
-                    chat_id=message.chat.id,
-                    video=new_file_path,
-                    caption=final_caption,
-                    thumb=thumbnail,
-                    supports_streaming=True
-                )
-            else:
-                await client.send_document(
-                    chat_id=message.chat.id,
-                    document=new_file_path,
-                    caption=final_caption,
-                    thumb=thumbnail
-                )
-        elif message.video:
-            await client.send_video(
-                chat_id=message.chat.id,
-                video=new_file_path,
-                caption=final_caption,
-                thumb=thumbnail,
-                supports_streaming=True
-            )
-        elif message.audio:
-            await client.send_audio(
-                chat_id=message.chat.id,
-                audio=new_file_path,
-                caption=final_caption,
-                thumb=thumbnail
-            )
-        
-        # Clean up
-        try:
-            os.remove(new_file_path)
-        except:
-            pass
-        
-        # Delete progress message
-        try:
-            await progress_msg.delete()
-        except:
-            pass
-        
-        return True
-        
-    except Exception as e:
-        logging.error(f"Error in rename and upload: {e}")
-        try:
-            await progress_msg.edit_text("❌ **Error occurred during processing**")
-        except:
-            pass
-        return False
+    return await run_rename_job(client, message, new_filename, progress_msg=progress_msg)
@@ -0,0 +1,134 @@
+import logging
+import time
+from pyrogram import Client, filters
+from pyrogram.types import Message, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
+from helper.integrity import get_media
+from helper.naming import batch_rename
+from helper.pipeline import run_job_group
+from helper.sequence import order_by_series
+from plugins.auto_rename import get_name_settings
+
+# get_messages accepts at most 200 ids per call, a batch is kept to one call
+MAX_BATCH = 200
+# Previews left unconfirmed longer than this are dropped
+PREVIEW_TIMEOUT = 600
+# Names listed in the preview, the rest is summarised to stay under the message limit
+PREVIEW_LINES = 40
+
+# Pending previews by (user id, preview message id): {'jobs': [(message, new_name)], 'created_at'}
+pending_batches = {}
+
+async def collect_batch(client, message: Message):
+    """Messages of the batch: the replied album, n files from the reply, or an id range"""
+    args = message.command[1:]
+    reply = message.reply_to_message
+
+    if reply and reply.media_group_id and not args:
+        messages = await client.get_media_group(message.chat.id, reply.id)
+    elif reply and len(args) == 1 and args[0].isdigit():
+        count = min(int(args[0]), MAX_BATCH)
+        messages = await client.get_messages(message.chat.id, list(range(reply.id, reply.id + count)))
+    elif len(args) == 2 and all(arg.isdigit() for arg in args):
+        first, last = sorted(int(arg) for arg in args)
+        last = min(last, first + MAX_BATCH - 1)
+        messages = await client.get_messages(message.chat.id, list(range(first, last + 1)))
+    else:
+        return None
+    return [m for m in messages if m and not m.empty and get_media(m)]
+
+def format_preview(results, series):
+    """List the new names under a header per series when there are several"""
+    lines = []
+    shown = 0
+    for title, indices in series:
+        if len(series) > 1 and shown < PREVIEW_LINES:
+            lines.append(f"\n**📺 {title}** ({len(indices)})")
+        for i in indices:
+            if shown < PREVIEW_LINES:
+                result = results[i]
+                lines.append(f"{shown + 1}. `{result['filename']}`\n    ➜ `{result['new_name']}`")
+            shown += 1
+    if len(results) > PREVIEW_LINES:
+        lines.append(f"... and {len(results) - PREVIEW_LINES} more")
+    return "\n".join(lines).strip()
+
+@Client.on_message(filters.private & filters.command("batchrename"))
+async def batch_rename_command(client, message: Message):
+    """Preview new names for a batch of files without downloading anything"""
+    user_id = message.from_user.id
+    try:
+        messages = await collect_batch(client, message)
+    except Exception as e:
+        logging.error(f"Batch collection error: {e}")
+        await message.reply_text(f"❌ **Could not read the files:** {e}")
+        return
+
+    if messages is None:
+        await message.reply_text(
+            "**📦 Batch Rename**\n\n"
+            "**Usage:**\n"
+            "• Reply to an album with `/batchrename`\n"
+            "• Reply to a file with `/batchrename <count>` to take it and the next files\n"
+            "• `/batchrename <first_id> <last_id>` for a message range\n\n"
+            f"Names come from your auto rename settings, up to {MAX_BATCH} files per batch."
+        )
+        return
+    if not messages:
+        await message.reply_text("❌ **No files found in that selection!**")
+        return
+
+    # Names are computed from the file names Telegram reports, nothing is downloaded
+    file_names = [get_media(m).file_name or f"file_{m.id}" for m in messages]
+    results = batch_rename(file_names, *await get_name_settings(user_id))
+    invalid = [result for result in results if not result['valid']]
+    # Files of several shows are grouped and each series put in episode order
+    series = order_by_series(file_names)
+
+    jobs = [
+        (messages[i], results[i]['new_name'])
+        for _, indices in series for i in indices if results[i]['valid']
+    ]
+    text = f"**📦 Batch Rename Preview ({len(results)} files)**\n\n{format_preview(results, series)}"
+    if invalid:
+        text += f"\n\n⚠️ {len(invalid)} name(s) are invalid and will be skipped."
+    preview = await message.reply_text(
+        text[:4000],
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("✅ Confirm", callback_data="batch_go"),
+            InlineKeyboardButton("❌ Cancel", callback_data="batch_no"),
+        ]])
+    )
+    now = time.time()
+    # Previews nobody answered would otherwise stay forever
+    for key in [key for key, batch in pending_batches.items() if now - batch['created_at'] > PREVIEW_TIMEOUT]:
+        del pending_batches[key]
+    # Keyed by the preview, so the buttons of an older preview confirm the batch it showed
+    pending_batches[(user_id, preview.id)] = {'jobs': jobs, 'created_at': now}
+
+@Client.on_callback_query(filters.regex(r"^batch_(go|no)$"))
+async def batch_rename_callback(client, query: CallbackQuery):
+    user_id = query.from_user.id
+    batch = pending_batches.pop((user_id, query.message.id), None)
+    await query.answer()
+
+    if query.data == "batch_no":
+        await query.message.edit_text("❌ **Batch rename cancelled.**")
+        return
+    if not batch or time.time() - batch['created_at'] > PREVIEW_TIMEOUT:
+        await query.message.edit_text("❌ **This preview expired, run /batchrename again.**")
+        return
+
+    jobs = batch['jobs']
+    if not jobs:
+        await query.message.edit_text("❌ **No valid names in this batch.**")
+        return
+    await query.message.edit_text(f"🔄 **Renaming {len(jobs)} files...**")
+    try:
+        # Refetch for fresh file references, the preview may be minutes old
+        fresh = await client.get_messages(query.message.chat.id, [msg.id for msg, _ in jobs])
+        by_id = {m.id: m for m in fresh if m and not m.empty}
+        jobs = [(by_id.get(msg.id, msg), name) for msg, name in jobs]
+        await run_job_group(client, user_id, jobs, query.message, title="Batch rename")
+    except Exception as e:
+        logging.error(f"Batch rename error for user {user_id}: {e}")
+        await query.message.edit_text(f"❌ **Batch rename failed:** {str(e)}")
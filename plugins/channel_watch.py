@@ -0,0 +1,340 @@
+import asyncio
+import logging
+from pyrogram import Client, filters
+from pyrogram.enums import ChatMemberStatus
+from pyrogram.errors import FloodWait
+from pyrogram.types import Message
+from config import Config
+from helper.database import DARKXSIDE78
+from helper.delivery import parse_destination, resolve_destination
+from helper.integrity import get_media
+from helper.naming import process_filename_auto
+from helper.pipeline import run_rename_job, SilentStatus
+from plugins.auto_rename import get_name_settings
+
+# Bots cannot read channel history, messages are fetched by id in pages of this size
+FETCH_BATCH = 200
+# Completed files between two checkpoint writes
+CHECKPOINT_EVERY = 50
+# Attempts for a page that fails with anything but FloodWait, with doubling delays
+FETCH_RETRIES = 5
+
+ADMIN_STATUSES = (ChatMemberStatus.OWNER, ChatMemberStatus.ADMINISTRATOR)
+
+# Bounds live channel posts, backfills run their own pool of the same size
+channel_semaphore = asyncio.Semaphore(Config.CHANNEL_WORKERS)
+# Running backfill tasks by channel id
+running_backfills = {}
+# Channels whose backfill /stopbackfill cancelled, any other cancel is a shutdown to resume from
+stopped_backfills = set()
+
+class Checkpoint:
+    """Low-water mark over message ids, every id below next_id is done
+
+    Workers finish out of order; only the contiguous prefix is persisted, so
+    a resumed backfill redoes at most the files that were in flight.
+    """
+
+    def __init__(self, next_id):
+        self.next_id = next_id
+        self.done = set()
+
+    def complete(self, message_id):
+        self.done.add(message_id)
+        while self.next_id in self.done:
+            self.done.remove(self.next_id)
+            self.next_id += 1
+
+async def rename_channel_post(client, message, watch, name_settings, job_settings=None):
+    file_name = get_media(message).file_name or f"file_{message.id}"
+    new_name = process_filename_auto(file_name, *name_settings)
+    return await run_rename_job(
+        client, message, new_name, progress_msg=SilentStatus(),
+        user_id=watch['owner'], chat_id=watch.get('target') or message.chat.id,
+        settings=job_settings
+    )
+
+# Our own posts are skipped, renamed files sent back to the watched channel would be renamed again
+@Client.on_message(filters.channel & ~filters.outgoing & (filters.document | filters.video | filters.audio))
+async def handle_channel_post(client, message: Message):
+    """Rename new posts of watched channels"""
+    watch = await DARKXSIDE78.get_channel_watch(message.chat.id)
+    if not watch or not watch.get('watching'):
+        return
+    async with channel_semaphore:
+        try:
+            name_settings = await get_name_settings(watch['owner'])
+            await rename_channel_post(client, message, watch, name_settings)
+        except Exception as e:
+            logging.error(f"Channel post {message.chat.id}/{message.id} rename error: {e}")
+
+async def fetch_page(client, chat_id, first_id, last_id):
+    """Fetch messages first_id..last_id by id, waiting out flood limits
+
+    Other errors are retried with backoff and raised once retries run out,
+    an empty page would mark messages done that were never fetched.
+    """
+    failures = 0
+    while True:
+        try:
+            messages = await client.get_messages(chat_id, list(range(first_id, last_id + 1)))
+            return {m.id: m for m in messages if m and not m.empty}
+        except FloodWait as e:
+            await asyncio.sleep(e.value)
+        except Exception as e:
+            failures += 1
+            if failures > FETCH_RETRIES:
+                raise
+            logging.warning(f"Backfill fetch {chat_id} {first_id}-{last_id} failed: {e}, retrying")
+            await asyncio.sleep(2 ** failures)
+
+async def run_backfill(client, chat_id, status_msg=None):
+    """Rename a message id range of a watched channel, resuming from its checkpoint"""
+    watch = await DARKXSIDE78.get_channel_watch(chat_id)
+    backfill = watch['backfill']
+    end = backfill['end']
+    checkpoint = Checkpoint(backfill['next_id'])
+    name_settings = await get_name_settings(watch['owner'])
+    # One settings load for the whole backfill
+    job_settings = await DARKXSIDE78.get_job_settings(watch['owner'])
+    workers = max(Config.CHANNEL_WORKERS, 1)
+    # Bounded so at most about one page is prefetched ahead of the workers
+    queue = asyncio.Queue(maxsize=FETCH_BATCH)
+    counters = {'since_save': 0, 'error': None}
+
+    async def save(final=False):
+        backfill['next_id'] = checkpoint.next_id
+        if final:
+            backfill['running'] = False
+        await DARKXSIDE78.save_backfill(chat_id, backfill)
+        if status_msg:
+            total = end - backfill['start'] + 1
+            done = checkpoint.next_id - backfill['start']
+            if final and checkpoint.next_id > end:
+                header = "✅ **Backfill finished!**"
+            elif final and counters['error']:
+                header = f"⚠️ **Backfill paused:** {counters['error']}\nUse `/backfill {chat_id}` to resume."
+            else:
+                header = "📚 **Backfilling...**"
+            try:
+                await status_msg.edit_text(
+                    f"{header}\n\n"
+                    f"**Channel:** `{chat_id}`\n"
+                    f"**Progress:** {done}/{total} messages\n"
+                    f"**Renamed:** {backfill['renamed']}\n"
+                    f"**Failed:** {backfill['failed']}"
+                )
+            except:
+                pass
+
+    async def completed(message_id):
+        checkpoint.complete(message_id)
+        counters['since_save'] += 1
+        if counters['since_save'] >= CHECKPOINT_EVERY:
+            counters['since_save'] = 0
+            await save()
+
+    async def producer():
+        first_id = checkpoint.next_id
+        next_page = asyncio.create_task(fetch_page(client, chat_id, first_id, min(first_id + FETCH_BATCH - 1, end)))
+        try:
+            while first_id <= end:
+                last_id = min(first_id + FETCH_BATCH - 1, end)
+                try:
+                    page = await next_page
+                except Exception as e:
+                    # The checkpoint stays before this page, in-flight files still finish
+                    logging.error(f"Backfill {chat_id} stopped at {first_id}: {e}")
+                    counters['error'] = e
+                    break
+                # Prefetch the following page while this one is being renamed
+                if last_id < end:
+                    next_page = asyncio.create_task(
+                        fetch_page(client, chat_id, last_id + 1, min(last_id + FETCH_BATCH, end))
+                    )
+                for message_id in range(first_id, last_id + 1):
+                    message = page.get(message_id)
+                    if message and get_media(message):
+                        await queue.put(message)
+                    else:
+                        await completed(message_id)
+                first_id = last_id + 1
+        finally:
+            # A prefetch still running when the loop fails or is cancelled would outlive the backfill
+            if not next_page.done():
+                next_page.cancel()
+            await asyncio.gather(next_page, return_exceptions=True)
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def worker():
+        while True:
+            message = await queue.get()
+            if message is None:
+                return
+            try:
+                success = await rename_channel_post(client, message, watch, name_settings, job_settings)
+            except Exception as e:
+                logging.error(f"Backfill {chat_id}/{message.id} failed: {e}")
+                success = False
+            backfill['renamed' if success else 'failed'] += 1
+            await completed(message.id)
+
+    try:
+        await asyncio.gather(producer(), *(worker() for _ in range(workers)))
+        # A page that could not be fetched pauses the backfill, /backfill resumes it
+        await save(final=True)
+    except asyncio.CancelledError:
+        # Keep the checkpoint either way, a shutdown leaves running set so resume_backfills restarts it
+        await save(final=chat_id in stopped_backfills)
+        raise
+    except Exception as e:
+        logging.error(f"Backfill {chat_id} error: {e}")
+        await save()
+    finally:
+        running_backfills.pop(chat_id, None)
+        stopped_backfills.discard(chat_id)
+
+def start_backfill(client, chat_id, status_msg=None):
+    if chat_id in running_backfills:
+        return False
+    running_backfills[chat_id] = asyncio.create_task(run_backfill(client, chat_id, status_msg))
+    return True
+
+async def resume_backfills(client):
+    """Restart backfills that were running when the bot stopped"""
+    for watch in await DARKXSIDE78.get_running_backfills():
+        chat_id = watch['_id']
+        status_msg = None
+        try:
+            status_msg = await client.send_message(watch['owner'], f"📚 **Resuming backfill of** `{chat_id}`...")
+        except Exception as e:
+            logging.error(f"Could not notify owner of backfill {chat_id}: {e}")
+        start_backfill(client, chat_id, status_msg)
+
+async def resolve_channel(client, message: Message, reference):
+    """Resolve a channel the user and the bot both administer, None after replying an error"""
+    try:
+        chat = await client.get_chat(parse_destination(reference))
+        member = await client.get_chat_member(chat.id, message.from_user.id)
+        me = await client.get_chat_member(chat.id, "me")
+    except Exception as e:
+        await message.reply_text(f"❌ Cannot access `{reference}`: {e}")
+        return None
+    if member.status not in ADMIN_STATUSES:
+        await message.reply_text("❌ **You must be an admin of that channel.**")
+        return None
+    if me.status not in ADMIN_STATUSES:
+        await message.reply_text("❌ **Add me to that channel as an admin first.**")
+        return None
+    return chat
+
+@Client.on_message(filters.private & filters.command("watch"))
+async def watch_command(client, message: Message):
+    """Rename new posts of a channel automatically"""
+    if len(message.command) < 2:
+        await message.reply_text(
+            "**Usage:** `/watch <channel> [target]`\n\n"
+            "New files posted in the channel are renamed with your auto rename settings "
+            "and sent to the target chat, the channel itself by default."
+        )
+        return
+
+    chat = await resolve_channel(client, message, message.command[1])
+    if not chat:
+        return
+    target = chat.id
+    if len(message.command) > 2:
+        target_chat, error = await resolve_destination(
+            client, parse_destination(message.command[2]), message.from_user.id
+        )
+        if error:
+            await message.reply_text(f"❌ {error}")
+            return
+        target = target_chat.id
+
+    await DARKXSIDE78.set_channel_watch(chat.id, message.from_user.id, target)
+    await message.reply_text(
+        f"👀 **Watching {chat.title}**\n\n"
+        f"New files will be renamed and sent to `{target}`.\n"
+        f"Use `/backfill {chat.id} <from_id> <to_id>` to rename older posts."
+    )
+
+@Client.on_message(filters.private & filters.command("unwatch"))
+async def unwatch_command(client, message: Message):
+    if len(message.command) < 2:
+        await message.reply_text("**Usage:** `/unwatch <channel>`")
+        return
+    chat = await resolve_channel(client, message, message.command[1])
+    if not chat:
+        return
+    watch = await DARKXSIDE78.get_channel_watch(chat.id)
+    if not watch:
+        await message.reply_text("❌ **That channel is not watched.**")
+        return
+    if chat.id in running_backfills:
+        await DARKXSIDE78.set_channel_watch(chat.id, watch['owner'], watch.get('target'), watching=False)
+    else:
+        await DARKXSIDE78.remove_channel_watch(chat.id)
+    await message.reply_text(f"✅ **Stopped watching {chat.title}**")
+
+@Client.on_message(filters.private & filters.command("backfill"))
+async def backfill_command(client, message: Message):
+    """Rename a range of older channel posts, or resume an interrupted backfill"""
+    if len(message.command) not in (2, 4):
+        await message.reply_text(
+            "**Usage:**\n"
+            "`/backfill <channel> <from_id> <to_id>` - rename posts in that id range\n"
+            "`/backfill <channel>` - resume an interrupted backfill"
+        )
+        return
+
+    chat = await resolve_channel(client, message, message.command[1])
+    if not chat:
+        return
+    if chat.id in running_backfills:
+        await message.reply_text("⏳ **A backfill is already running for that channel.**")
+        return
+
+    watch = await DARKXSIDE78.get_channel_watch(chat.id)
+    if len(message.command) == 4:
+        try:
+            start, end = sorted((int(message.command[2]), int(message.command[3])))
+        except ValueError:
+            await message.reply_text("❌ **Message ids must be numbers.**")
+            return
+        if not watch:
+            # A backfill alone does not rename new posts
+            await DARKXSIDE78.set_channel_watch(chat.id, message.from_user.id, chat.id, watching=False)
+        await DARKXSIDE78.save_backfill(chat.id, {
+            'start': max(start, 1), 'end': end, 'next_id': max(start, 1),
+            'renamed': 0, 'failed': 0, 'running': True,
+        })
+    else:
+        backfill = (watch or {}).get('backfill')
+        if not backfill or backfill['next_id'] > backfill['end']:
+            await message.reply_text("❌ **No unfinished backfill for that channel.**")
+            return
+        backfill['running'] = True
+        await DARKXSIDE78.save_backfill(chat.id, backfill)
+
+    status_msg = await message.reply_text(f"📚 **Backfilling {chat.title}...**")
+    start_backfill(client, chat.id, status_msg)
+
+@Client.on_message(filters.private & filters.command("stopbackfill"))
+async def stop_backfill_command(client, message: Message):
+    if len(message.command) < 2:
+        await message.reply_text("**Usage:** `/stopbackfill <channel>`")
+        return
+    chat = await resolve_channel(client, message, message.command[1])
+    if not chat:
+        return
+    task = running_backfills.get(chat.id)
+    if not task:
+        await message.reply_text("❌ **No backfill is running for that channel.**")
+        return
+    stopped_backfills.add(chat.id)
+    task.cancel()
+    await message.reply_text(
+        f"⏹️ **Backfill stopped.**\n\nUse `/backfill {chat.id}` to resume from the last checkpoint."
+    )
@@ -0,0 +1,87 @@
+import logging
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from helper.database import DARKXSIDE78
+from helper.integrity import get_media
+from helper.naming import process_filename_auto
+from helper.pipeline import run_job_group
+from helper.sequence import order_by_series
+from plugins.auto_rename import get_name_settings
+
+# get_messages accepts at most 200 ids per call
+FETCH_BATCH = 200
+
+async def fetch_sequence_messages(client, files):
+    """Fetch the buffered messages again, which also gives fresh file references"""
+    by_chat = {}
+    for item in files:
+        by_chat.setdefault(item['chat_id'], []).append(item['message_id'])
+
+    messages = []
+    for chat_id, message_ids in by_chat.items():
+        for i in range(0, len(message_ids), FETCH_BATCH):
+            try:
+                fetched = await client.get_messages(chat_id, message_ids[i:i + FETCH_BATCH])
+                messages += [m for m in fetched if m and not m.empty and get_media(m)]
+            except Exception as e:
+                logging.error(f"Error fetching sequence messages from {chat_id}: {e}")
+    return messages
+
+async def run_sequence(client, user_id, messages, status_msg):
+    """Group a sequence by series, sort it naturally and rename it as one ordered job group"""
+    name_settings = await get_name_settings(user_id)
+
+    file_names = [get_media(message).file_name or f"file_{message.id}" for message in messages]
+
+    # Each series in episode order, one series after the other
+    jobs = [
+        (messages[i], process_filename_auto(file_names[i], *name_settings))
+        for _, indices in order_by_series(file_names)
+        for i in indices
+    ]
+    await run_job_group(client, user_id, jobs, status_msg, title="Sequence")
+
+@Client.on_message(filters.private & filters.command("ssequence"))
+async def start_sequence_command(client, message: Message):
+    """Start collecting files for a sequence"""
+    user_id = message.from_user.id
+    sequence = await DARKXSIDE78.get_sequence(user_id)
+    if sequence:
+        await message.reply_text(
+            f"📚 **Sequence already active** with {len(sequence.get('files', []))} file(s).\n\n"
+            f"Send more files or use /esequence to process them."
+        )
+        return
+
+    await DARKXSIDE78.start_sequence(user_id)
+    await message.reply_text(
+        "📚 **Sequence started!**\n\n"
+        "Send all files of the sequence, then use /esequence.\n"
+        "They will be sorted by season and episode, renamed with your auto rename "
+        "settings and sent back in order."
+    )
+
+@Client.on_message(filters.private & filters.command("esequence"))
+async def end_sequence_command(client, message: Message):
+    """Process the collected sequence"""
+    user_id = message.from_user.id
+    sequence = await DARKXSIDE78.end_sequence(user_id)
+    if not sequence:
+        await message.reply_text("❌ **No active sequence!**\n\nUse /ssequence to start one.")
+        return
+
+    files = sequence.get('files', [])
+    if not files:
+        await message.reply_text("❌ **Sequence is empty!**")
+        return
+
+    status_msg = await message.reply_text(f"📚 **Processing {len(files)} file(s) in sequence...**")
+    try:
+        messages = await fetch_sequence_messages(client, files)
+        if not messages:
+            await status_msg.edit_text("❌ **Files of the sequence are no longer available!**")
+            return
+        await run_sequence(client, user_id, messages, status_msg)
+    except Exception as e:
+        logging.error(f"Sequence error for user {user_id}: {e}")
+        await status_msg.edit_text(f"❌ **Sequence failed:** {str(e)}")
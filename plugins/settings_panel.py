@@ -1,8 +1,9 @@
 import asyncio
-import math
 from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery, Message, InputMediaPhoto
 from helper.database import DARKXSIDE78
+from helper.delivery import parse_destination, resolve_destination
+from helper.ffmpeg_runner import ffmpeg_scheduler
 from config import Config
 import logging
 
@@ -22,16 +23,6 @@ async def get_settings_photo(user_id: int):
     else:
         return SETTINGS_PHOTO
 
-def get_readable_file_size(size_bytes):
-    """Convert bytes to readable format"""
-    if size_bytes == 0:
-        return "0B"
-    size_name = ["B", "KB", "MB", "GB", "TB"]
-    i = int(math.floor(math.log(size_bytes, 1024)))
-    p = math.pow(1024, i)
-    s = round(size_bytes / p, 2)
-    return f"{s} {size_name[i]}"
-
 @Client.on_message(filters.private & filters.command("settings"))
 async def settings_command(client, message: Message):
     """Main settings command"""
@@ -57,6 +48,8 @@ async def settings_command(client, message: Message):
 **Upload Destination:** {settings['upload_destination'] or 'None'}
 **Sample Video:** {'Enabled' if settings['sample_video'] else 'Disabled'}
 **Screenshot:** {'Enabled' if settings['screenshot_enabled'] else 'Disabled'}
+**Album Mode:** {'Enabled' if settings['album_mode'] else 'Disabled'}
+**Remux to MP4:** {'Enabled' if settings['remux_mode'] else 'Disabled'}
 
 **Metadata:** {'Enabled' if metadata_status != 'Off' else 'Disabled'}
 **Remove/Replace Words:** {settings['remove_words'] or 'None'}
@@ -86,7 +79,11 @@ async def settings_command(client, message: Message):
             InlineKeyboardButton(f"Enable Sample Video", callback_data="setting_sample_video")
         ],
         [
-            InlineKeyboardButton(f"Enable Screenshot", callback_data="setting_screenshot")
+            InlineKeyboardButton(f"Enable Screenshot", callback_data="setting_screenshot"),
+            InlineKeyboardButton(f"Album Mode", callback_data="setting_album_mode")
+        ],
+        [
+            InlineKeyboardButton(f"Remux to MP4", callback_data="setting_remux")
         ]
     ])
 
@@ -162,6 +159,12 @@ async def settings_callback_handler(client, query: CallbackQuery):
         elif data == "setting_screenshot":
             await handle_screenshot_setting(client, query)
             
+        elif data == "setting_album_mode":
+            await handle_album_mode_setting(client, query)
+            
+        elif data == "setting_remux":
+            await handle_remux_setting(client, query)
+            
         # Handle back to main settings
         elif data == "settings_back":
             await show_main_settings(client, query)
@@ -202,6 +205,8 @@ async def show_main_settings(client, query: CallbackQuery):
 **Upload Destination:** {settings['upload_destination'] or 'None'}
 **Sample Video:** {'Enabled' if settings['sample_video'] else 'Disabled'}
 **Screenshot:** {'Enabled' if settings['screenshot_enabled'] else 'Disabled'}
+**Album Mode:** {'Enabled' if settings['album_mode'] else 'Disabled'}
+**Remux to MP4:** {'Enabled' if settings['remux_mode'] else 'Disabled'}
 
 **Metadata:** {'Enabled' if metadata_status != 'Off' else 'Disabled'}
 **Remove/Replace Words:** {settings['remove_words'] or 'None'}
@@ -231,7 +236,11 @@ async def show_main_settings(client, query: CallbackQuery):
             InlineKeyboardButton(f"Enable Sample Video", callback_data="setting_sample_video")
         ],
         [
-            InlineKeyboardButton(f"Enable Screenshot", callback_data="setting_screenshot")
+            InlineKeyboardButton(f"Enable Screenshot", callback_data="setting_screenshot"),
+            InlineKeyboardButton(f"Album Mode", callback_data="setting_album_mode")
+        ],
+        [
+            InlineKeyboardButton(f"Remux to MP4", callback_data="setting_remux")
         ]
     ])
 
@@ -327,7 +336,34 @@ async def handle_rename_mode_selection(client, query: CallbackQuery):
 
 async def handle_upload_destination(client, query: CallbackQuery):
     """Handle upload destination setting"""
-    await query.answer("This feature will be available soon!", show_alert=True)
+    user_id = query.from_user.id
+    
+    # Set user state for destination input
+    user_states[user_id] = {
+        'action': 'set_upload_destination',
+        'message': query.message
+    }
+    
+    settings = await DARKXSIDE78.get_user_settings(user_id)
+    
+    text = f"""**📤 Set Upload Destination**
+
+Current Destination: `{settings.get('upload_destination') or 'None'}`
+
+Send a channel/group ID or @username where renamed files should also be delivered.
+The bot must be an admin there. Files are copied, not uploaded again.
+
+Send `none` to remove the destination.
+Send /cancel to cancel."""
+    
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🔙 Back", callback_data="settings_back")]
+    ])
+    
+    try:
+        await query.message.edit_caption(caption=text, reply_markup=keyboard)
+    except:
+        await query.message.edit_text(text=text, reply_markup=keyboard)
 
 async def handle_thumbnail_setting(client, query: CallbackQuery):
     """Handle thumbnail setting"""
@@ -440,8 +476,9 @@ async def handle_remove_words_setting(client, query: CallbackQuery):
 
 Current Remove Words: `{remove_words or 'None'}`
 
-Send words to remove from filename (separated by commas).
-Example: word1,word2,word3
+Send words to remove or replace (separated by commas).
+`word` removes it, `old => new` replaces it, `/regex/ =>` or `/regex/ => new` uses a regular expression.
+Example: `word1,720p => 1080p,/\\[.*?\\]/ =>`
 
 Send /cancel to cancel."""
     
@@ -484,8 +521,43 @@ async def handle_screenshot_setting(client, query: CallbackQuery):
     # Go back to main settings
     await show_main_settings(client, query)
 
+async def handle_album_mode_setting(client, query: CallbackQuery):
+    """Handle album mode setting"""
+    user_id = query.from_user.id
+    settings = await DARKXSIDE78.get_user_settings(user_id)
+    
+    # Toggle album mode setting
+    new_value = not settings.get('album_mode', False)
+    await DARKXSIDE78.update_user_setting(user_id, 'album_mode', new_value)
+    
+    status = "Enabled" if new_value else "Disabled"
+    await query.answer(f"Album Mode {status} ✅")
+    
+    # Go back to main settings
+    await show_main_settings(client, query)
+
+async def handle_remux_setting(client, query: CallbackQuery):
+    """Handle remux setting"""
+    user_id = query.from_user.id
+    settings = await DARKXSIDE78.get_user_settings(user_id)
+    
+    # Toggle MKV/MP4 to faststart MP4 remux
+    new_value = not settings.get('remux_mode', False)
+    await DARKXSIDE78.update_user_setting(user_id, 'remux_mode', new_value)
+    
+    status = "Enabled" if new_value else "Disabled"
+    await query.answer(f"Remux to MP4 {status} ✅")
+    
+    # Go back to main settings
+    await show_main_settings(client, query)
+
+async def awaiting_setting(_, __, message):
+    # Only take text while a settings prompt waits for it, other handlers see the rest
+    state = user_states.get(message.from_user.id) if message.from_user else None
+    return bool(state and state.get('action'))
+
 # Handle text input for settings
-@Client.on_message(filters.private & filters.text & ~filters.command(['start', 'help', 'settings', 'cancel']))
+@Client.on_message(filters.private & filters.text & filters.create(awaiting_setting) & ~filters.command(['start', 'help', 'settings', 'cancel', 'url']))
 async def handle_settings_text_input(client, message: Message):
     """Handle text input for settings"""
     user_id = message.from_user.id
@@ -518,7 +590,19 @@ async def handle_settings_text_input(client, message: Message):
             
         elif action == 'set_remove_words':
             await DARKXSIDE78.set_remove_words(user_id, text_input)
-            await client.send_message(user_id, f"✅ Remove words set to: `{text_input}`")
+            await client.send_message(user_id, f"✅ Remove/replace rules set to: `{text_input}`")
+        
+        elif action == 'set_upload_destination':
+            destination = parse_destination(text_input)
+            if destination is not None:
+                chat, error = await resolve_destination(client, destination, user_id)
+                if error:
+                    await client.send_message(user_id, f"❌ {error}")
+                    del user_states[user_id]
+                    return
+                destination = chat.id
+            await DARKXSIDE78.update_user_setting(user_id, 'upload_destination', destination)
+            await client.send_message(user_id, f"✅ Upload destination set to: `{destination or 'None'}`")
         
         # Clear user state
         del user_states[user_id]
@@ -551,5 +635,7 @@ async def cancel_settings_input(client, message: Message):
     if user_id in user_states:
         del user_states[user_id]
         await message.reply_text("❌ **Cancelled**")
+    elif ffmpeg_scheduler.cancel_user(user_id):
+        await message.reply_text("❌ **Running media processing cancelled**")
     else:
         await message.reply_text("Nothing to cancel.")
@@ -0,0 +1,64 @@
+import logging
+from urllib.parse import urlparse
+from pyrogram import Client, filters
+from pyrogram.types import Message
+from config import Config
+from helper.naming import is_valid_filename, process_filename_auto
+from helper.pipeline import run_rename_job
+from helper.url_download import UrlSource, BlockedAddress
+from helper.utils import humanbytes
+from plugins.auto_rename import get_name_settings
+
+@Client.on_message(filters.private & filters.command("url"))
+async def url_command(client, message: Message):
+    """Download a direct link and send it renamed like an uploaded file"""
+    if len(message.command) < 2:
+        await message.reply_text(
+            "**Usage:** `/url <link> [new name]`\n\n"
+            "The file is downloaded over several connections when the server allows it. "
+            "Without a new name your auto rename settings are applied."
+        )
+        return
+
+    url = message.command[1]
+    if urlparse(url).scheme not in ('http', 'https'):
+        await message.reply_text("❌ Only http and https links are supported.")
+        return
+
+    status = await message.reply_text("🔎 **Checking link...**")
+    try:
+        source = await UrlSource.open(url)
+    except BlockedAddress as e:
+        logging.warning(f"Blocked URL from {message.from_user.id}: {e}")
+        await status.edit_text("❌ This link points to an address the bot cannot access.")
+        return
+    except Exception as e:
+        logging.error(f"URL probe error for {url}: {e}")
+        await status.edit_text(f"❌ Cannot open the link: {e}")
+        return
+
+    if Config.URL_MAX_SIZE and source.size > Config.URL_MAX_SIZE:
+        await status.edit_text(
+            f"❌ The file is {humanbytes(source.size)}, the limit for links is {humanbytes(Config.URL_MAX_SIZE)}."
+        )
+        return
+
+    user_id = message.from_user.id
+    if len(message.command) > 2:
+        new_name = message.text.split(None, 2)[2].strip()
+        if not is_valid_filename(new_name):
+            await status.edit_text("❌ Invalid file name.")
+            return
+    else:
+        new_name = process_filename_auto(source.name, *await get_name_settings(user_id))
+
+    size = humanbytes(source.size) if source.size else "unknown size"
+    await status.edit_text(f"📥 **Downloading** `{source.name}` ({size})\n\n**New name:** `{new_name}`")
+    try:
+        await run_rename_job(client, message, new_name, progress_msg=status, source=source)
+    except Exception as e:
+        logging.error(f"URL rename error for {url}: {e}")
+        try:
+            await status.edit_text(f"❌ Error: {e}")
+        except:
+            pass
@@ -0,0 +1,34 @@
+import importlib
+from pathlib import Path
+import pytest
+from pyrogram.handlers import MessageHandler
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def load_message_handlers():
+    """Message handlers per group, in the order Client.load_plugins adds them"""
+    groups = {}
+    for path in sorted(Path(ROOT, "plugins").rglob("*.py")):
+        module = importlib.import_module(".".join(path.relative_to(ROOT).with_suffix("").parts))
+        for name in vars(module).keys():
+            for handler, group in getattr(getattr(module, name), 'handlers', ()):
+                if isinstance(handler, MessageHandler):
+                    groups.setdefault(group, []).append(handler)
+    return dict(sorted(groups.items()))
+
+@pytest.fixture(scope="session")
+def message_handlers():
+    return load_message_handlers()
+
+@pytest.fixture
+def dispatch(message_handlers):
+    """Return the callbacks the dispatcher would run for a message, one per group"""
+    async def run(client, message):
+        chosen = []
+        for handlers in message_handlers.values():
+            for handler in handlers:
+                if await handler.check(client, message):
+                    chosen.append(handler.callback)
+                    break
+        return chosen
+    return run
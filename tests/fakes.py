@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+from pyrogram.enums import ChatType
+from pyrogram.types import Chat, Document, Message, User
+
+class FakeClient(SimpleNamespace):
+    """Records what handlers send instead of talking to Telegram"""
+
+    def __init__(self, **methods):
+        super().__init__(me=SimpleNamespace(username="renamebot"), sent=[], **methods)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+def private_text(client, text, user_id=1001):
+    message = Message(
+        id=1, chat=Chat(id=user_id, type=ChatType.PRIVATE), from_user=User(id=user_id),
+        text=text, client=client
+    )
+
+    async def delete(*args, **kwargs):
+        return True
+    message.delete = delete
+    return message
+
+def channel_document(client, chat_id=-1001234, message_id=1, outgoing=False):
+    return Message(
+        id=message_id, chat=Chat(id=chat_id, type=ChatType.CHANNEL), outgoing=outgoing, client=client,
+        document=Document(file_id="file", file_unique_id=f"unique{message_id}", file_name="Show E01.mkv")
+    )
@@ -0,0 +1,47 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import plugins.batch_rename as batch_rename
+from tests.fakes import FakeClient
+
+class FakeQuery(SimpleNamespace):
+    def __init__(self, data, preview_id, user_id=1001):
+        super().__init__(
+            data=data, from_user=SimpleNamespace(id=user_id), answered=False,
+            message=SimpleNamespace(id=preview_id, chat=SimpleNamespace(id=user_id), edit_text=self.edit_text)
+        )
+
+    async def answer(self, *args, **kwargs):
+        self.answered = True
+
+    async def edit_text(self, text, **kwargs):
+        self.text = text
+
+def test_confirm_runs_the_batch_of_its_own_preview(monkeypatch):
+    ran = []
+
+    async def run_job_group(client, user_id, jobs, status_msg, title):
+        ran.append([name for _, name in jobs])
+
+    async def get_messages(chat_id, ids):
+        return []
+
+    monkeypatch.setattr(batch_rename, 'run_job_group', run_job_group)
+    files = lambda *names: {'jobs': [(SimpleNamespace(id=i), name) for i, name in enumerate(names)], 'created_at': time.time()}
+    monkeypatch.setitem(batch_rename.pending_batches, (1001, 10), files("Old E01.mkv"))
+    monkeypatch.setitem(batch_rename.pending_batches, (1001, 20), files("New E01.mkv", "New E02.mkv"))
+
+    query = FakeQuery("batch_go", preview_id=10)
+    asyncio.run(batch_rename.batch_rename_callback(FakeClient(get_messages=get_messages), query))
+    assert query.answered
+    assert ran == [["Old E01.mkv"]]
+    assert (1001, 20) in batch_rename.pending_batches
+
+def test_cancel_answers_and_drops_only_its_preview(monkeypatch):
+    monkeypatch.setitem(batch_rename.pending_batches, (1001, 10), {'jobs': [], 'created_at': time.time()})
+    monkeypatch.setitem(batch_rename.pending_batches, (1001, 20), {'jobs': [], 'created_at': time.time()})
+    query = FakeQuery("batch_no", preview_id=20)
+    asyncio.run(batch_rename.batch_rename_callback(FakeClient(), query))
+    assert query.answered
+    assert query.text == "❌ **Batch rename cancelled.**"
+    assert list(batch_rename.pending_batches) == [(1001, 10)]
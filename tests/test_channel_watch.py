@@ -0,0 +1,64 @@
+import asyncio
+import plugins.channel_watch as channel_watch
+from tests.fakes import FakeClient, channel_document
+
+def test_own_channel_posts_are_not_renamed(dispatch):
+    client = FakeClient()
+    names = lambda callbacks: [c.__name__ for c in callbacks]
+    assert "handle_channel_post" in names(asyncio.run(dispatch(client, channel_document(client))))
+    assert "handle_channel_post" not in names(asyncio.run(dispatch(client, channel_document(client, outgoing=True))))
+
+def run_cancelled_backfill(monkeypatch, stop):
+    """Cancel a backfill while a file renames and the next page is prefetched"""
+    backfill = {'start': 1, 'end': 400, 'next_id': 1, 'renamed': 0, 'failed': 0, 'running': True}
+    saved = []
+    prefetch = {}
+
+    async def get_channel_watch(chat_id):
+        return {'_id': chat_id, 'owner': 1001, 'backfill': backfill}
+
+    async def get_settings(user_id):
+        return {}
+
+    async def save_backfill(chat_id, data):
+        saved.append(dict(data))
+
+    async def fetch_page(client, chat_id, first_id, last_id):
+        if first_id > 1:
+            prefetch['task'] = asyncio.current_task()
+            await asyncio.Event().wait()
+        return {1: channel_document(client, chat_id, 1)}
+
+    async def rename_channel_post(*args):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(channel_watch.DARKXSIDE78, 'get_channel_watch', get_channel_watch)
+    monkeypatch.setattr(channel_watch.DARKXSIDE78, 'get_job_settings', get_settings)
+    monkeypatch.setattr(channel_watch.DARKXSIDE78, 'save_backfill', save_backfill)
+    monkeypatch.setattr(channel_watch, 'get_name_settings', get_settings)
+    monkeypatch.setattr(channel_watch, 'fetch_page', fetch_page)
+    monkeypatch.setattr(channel_watch, 'rename_channel_post', rename_channel_post)
+
+    async def run():
+        channel_watch.start_backfill(FakeClient(), -1001234)
+        task = channel_watch.running_backfills[-1001234]
+        while 'task' not in prefetch:
+            await asyncio.sleep(0)
+        if stop:
+            channel_watch.stopped_backfills.add(-1001234)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return prefetch['task']
+    return asyncio.run(run()), saved
+
+def test_shutdown_keeps_the_backfill_running(monkeypatch):
+    prefetch, saved = run_cancelled_backfill(monkeypatch, stop=False)
+    assert prefetch.cancelled()
+    assert saved[-1]['running'] is True
+    assert saved[-1]['next_id'] == 1
+
+def test_stopbackfill_clears_running(monkeypatch):
+    prefetch, saved = run_cancelled_backfill(monkeypatch, stop=True)
+    assert prefetch.cancelled()
+    assert saved[-1]['running'] is False
+    assert -1001234 not in channel_watch.stopped_backfills
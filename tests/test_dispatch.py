@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+from pyrogram.enums import ChatMemberStatus, ChatType
+import plugins.settings_panel as settings_panel
+from tests.fakes import FakeClient, private_text
+
+def test_url_command_reaches_its_handler(dispatch):
+    client = FakeClient()
+    message = private_text(client, "/url https://example.com/Show.S01E02.mkv")
+    callbacks = asyncio.run(dispatch(client, message))
+    assert [f"{c.__module__}.{c.__name__}" for c in callbacks] == ["plugins.url_rename.url_command"]
+
+def test_upload_destination_is_saved(dispatch, monkeypatch):
+    saved = {}
+
+    async def update_user_setting(user_id, key, value):
+        saved[key] = value
+
+    async def no_wait(seconds):
+        pass
+
+    async def get_chat(reference):
+        return SimpleNamespace(id=-1001234, type=ChatType.CHANNEL, permissions=None)
+
+    async def get_chat_member(chat_id, user_id):
+        return SimpleNamespace(status=ChatMemberStatus.OWNER, privileges=None)
+
+    monkeypatch.setattr(settings_panel.DARKXSIDE78, 'update_user_setting', update_user_setting)
+    monkeypatch.setattr(settings_panel.asyncio, 'sleep', no_wait)
+    monkeypatch.setitem(settings_panel.user_states, 1001, {'action': 'set_upload_destination'})
+
+    client = FakeClient(get_chat=get_chat, get_chat_member=get_chat_member)
+    message = private_text(client, "@mychannel")
+
+    async def run():
+        for callback in await dispatch(client, message):
+            await callback(client, message)
+    asyncio.run(run())
+
+    assert saved == {'upload_destination': -1001234}
+    assert 1001 not in settings_panel.user_states
+    assert client.sent[-1][1] == "✅ Upload destination set to: `-1001234`"
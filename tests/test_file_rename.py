@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+import plugins.file_rename as file_rename
+from tests.fakes import FakeClient
+
+def queue_files(monkeypatch, count, workers=2):
+    running = {'now': 0, 'peak': 0}
+
+    async def rename(client, message, name):
+        running['now'] += 1
+        running['peak'] = max(running['peak'], running['now'])
+        await asyncio.sleep(0.01)
+        running['now'] -= 1
+        return True
+
+    async def refresh_stale(client, entries):
+        pass
+
+    monkeypatch.setattr(file_rename, 'rename_and_upload_file_direct', rename)
+    monkeypatch.setattr(file_rename.reference_refresher, 'refresh_stale', refresh_stale)
+    monkeypatch.setattr(file_rename.Config, 'SEQUENCE_WORKERS', workers)
+    monkeypatch.setitem(file_rename.user_rename_states, 1001, {
+        'queue': [{'original_message': SimpleNamespace(id=i)} for i in range(count)],
+        'rename_message': None,
+    })
+    return running
+
+def test_submitted_renames_share_a_bounded_pool(monkeypatch):
+    running = queue_files(monkeypatch, 5)
+    client = FakeClient()
+    results = asyncio.run(file_rename.submit_renames(client, 1001, "Show E{n:02}.mkv", 1001))
+    assert results == [True] * 5
+    assert running['peak'] == 2
+    assert 1001 not in file_rename.user_rename_states
+
+def test_names_beyond_the_queue_are_reported(monkeypatch):
+    queue_files(monkeypatch, 2)
+    client = FakeClient()
+    results = asyncio.run(file_rename.submit_renames(client, 1001, "A.mkv\nB.mkv\nC.mkv\nD.mkv", 1001))
+    assert results == [True, True]
+    assert client.sent == [(1001, "⚠️ **2 name(s) were not used,** only 2 file(s) were waiting.")]
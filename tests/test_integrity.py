@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from pyrogram.errors import FloodWait, MessageIdInvalid
+import helper.integrity as integrity
+from helper.integrity import CHUNK_SIZE, download_verified
+
+DATA = bytes(range(256)) * (CHUNK_SIZE // 256) * 2 + b"tail"
+
+class StreamClient:
+    """Streams DATA in 1 MiB chunks, each pass first raises the next queued error"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.passes = 0
+
+    async def stream_media(self, message, offset=0):
+        self.passes += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        for position in range(offset * CHUNK_SIZE, len(DATA), CHUNK_SIZE):
+            yield DATA[position:position + CHUNK_SIZE]
+
+def message():
+    return SimpleNamespace(document=SimpleNamespace(file_size=len(DATA)), video=None, audio=None)
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+    monkeypatch.setattr(integrity.asyncio, 'sleep', sleep)
+    return slept
+
+def download(client, tmp_path):
+    return asyncio.run(download_verified(client, message(), str(tmp_path / "file")))
+
+def test_flood_wait_is_slept_out(tmp_path, sleeps):
+    client = StreamClient(FloodWait(value=7))
+    result = download(client, tmp_path)
+    assert sleeps == [7]
+    assert result['size'] == len(DATA)
+    assert (tmp_path / "file").read_bytes() == DATA
+
+def test_network_errors_retry_with_backoff(tmp_path, sleeps):
+    client = StreamClient(ConnectionResetError(), ConnectionResetError())
+    assert download(client, tmp_path)['size'] == len(DATA)
+    assert sleeps == [2, 4]
+
+def test_network_errors_give_up_after_retries(tmp_path, sleeps):
+    client = StreamClient(*[ConnectionResetError()] * (integrity.MAX_RETRIES + 1))
+    with pytest.raises(ConnectionResetError):
+        download(client, tmp_path)
+
+def test_permanent_errors_are_raised_at_once(tmp_path, sleeps):
+    client = StreamClient(MessageIdInvalid())
+    with pytest.raises(MessageIdInvalid):
+        download(client, tmp_path)
+    assert client.passes == 1
+    assert sleeps == []
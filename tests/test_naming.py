@@ -0,0 +1,16 @@
+from helper.naming import process_filename_auto
+from helper.template import CompiledTemplate
+
+def test_template_with_missing_field_renders_nothing():
+    assert CompiledTemplate("[episode]").render("movie.mkv") is None
+    assert CompiledTemplate("Show S{season}E{episode} [{quality}]").render("Frieren - 12.mkv") is None
+
+def test_template_renders_when_every_field_is_found():
+    template = CompiledTemplate("Show S{season}E{episode} [{quality}]")
+    assert template.render("Frieren S01E12 1080p.mkv") == "Show S01E12 [1080p].mkv"
+
+def test_missing_field_keeps_the_name_without_template():
+    assert process_filename_auto("movie.mkv", template=CompiledTemplate("[episode]")) == "movie.mkv"
+    assert process_filename_auto(
+        "Frieren - 12.mkv", prefix="[Group]", template=CompiledTemplate("Show S{season}E{episode} [{quality}]")
+    ) == "[Group] Frieren - 12.mkv"
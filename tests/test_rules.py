@@ -0,0 +1,30 @@
+from helper.rules import CompiledRules, parse_rules
+
+def test_plain_entries_keep_meaning_remove():
+    assert parse_rules("https://t.me/Anime_Channel,/r/anime") == [
+        ("https://t.me/Anime_Channel", "", False),
+        ("/r/anime", "", False),
+    ]
+    rules = CompiledRules("https://t.me/Anime_Channel,[Tag]")
+    assert rules.apply("[Tag] Show https://t.me/Anime_Channel E01.mkv") == "Show E01.mkv"
+
+def test_literal_and_regex_replacements():
+    rules = CompiledRules("WEBRip => WEB-DL,/\\[[0-9A-F]{8}\\]/ =>")
+    assert rules.apply("Show E01 WEBRip [ABCD1234].mkv") == "Show E01 WEB-DL .mkv"
+
+def test_numbered_backreference_next_to_literal_rules():
+    rules = CompiledRules("aa,/(b)\\1/=>X")
+    assert rules.apply("xx bb aa yy") == "xx X yy"
+
+def test_backreference_in_replacement():
+    rules = CompiledRules("/S(\\d+)E(\\d+)/ => \\1x\\2")
+    assert rules.apply("Show S01E02.mkv") == "Show 01x02.mkv"
+
+def test_lookarounds_see_the_whole_name():
+    rules = CompiledRules("/(?<=Show )Part/ => Season,/\\d+(?=p)/ => 1080")
+    assert rules.apply("Show Part 2 720p.mkv") == "Show Season 2 1080p.mkv"
+    assert rules.apply("Part 2 720.mkv") == "Part 2 720.mkv"
+
+def test_invalid_replacement_skips_only_that_rule():
+    rules = CompiledRules("/(a)/ => \\2,WEBRip => WEB")
+    assert rules.apply("a WEBRip.mkv") == "a WEB.mkv"
@@ -0,0 +1,20 @@
+import re
+from helper.splitter import segment_outputs, segment_pattern
+
+def expand(pattern, number):
+    """Expand a segment pattern the way ffmpeg names its outputs"""
+    return re.sub(r"%%|%03d", lambda m: "%" if m.group() == "%%" else f"{number:03d}", pattern)
+
+def test_percent_in_file_name_is_escaped(tmp_path):
+    pattern = segment_pattern(str(tmp_path), "100% Done %d", ".mkv")
+    assert pattern.count("%03d") == 1
+    assert expand(pattern, 1) == str(tmp_path / "100% Done %d.part001.mkv")
+
+def test_outputs_are_listed_by_exact_name(tmp_path):
+    name = "Show [1080p] *"
+    for number in range(3):
+        (tmp_path / expand(segment_pattern(str(tmp_path), name, ".mkv"), number)).write_bytes(b"x")
+    (tmp_path / "Show 1.part000.mkv").write_bytes(b"other file")
+    assert segment_outputs(str(tmp_path), name, ".mkv") == [
+        str(tmp_path / f"{name}.part{number:03d}.mkv") for number in range(3)
+    ]
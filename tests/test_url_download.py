@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import os
+import re
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import helper.url_download as url_download
+
+DATA = os.urandom(1024 * 1024 + 123)
+SHA256 = hashlib.sha256(DATA).hexdigest()
+RANGE = re.compile(r"bytes=(\d+)-(\d*)")
+
+def parse_range(request):
+    match = RANGE.match(request.headers.get('Range', ''))
+    if not match:
+        return None
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else len(DATA) - 1
+    return start, min(end, len(DATA) - 1)
+
+def partial_response(start, end):
+    return web.Response(status=206, body=DATA[start:end + 1], headers={
+        'Content-Range': f"bytes {start}-{end}/{len(DATA)}",
+        'Content-Disposition': 'attachment; filename="Show.S01E02.mkv"',
+    })
+
+async def ranged(request):
+    byte_range = parse_range(request)
+    if byte_range is None:
+        return web.Response(body=DATA)
+    return partial_response(*byte_range)
+
+async def plain(request):
+    return web.Response(body=DATA)
+
+async def to_private(request):
+    raise web.HTTPFound("http://10.0.0.5/file.mkv")
+
+async def probe_only_ranges(request):
+    # Answers the one byte probe with 206, every later range with the whole file
+    byte_range = parse_range(request)
+    if byte_range == (0, 0):
+        return partial_response(0, 0)
+    return web.Response(body=DATA)
+
+def interrupted():
+    """Handler cutting the first request of each part halfway, and the cut part ends"""
+    cut = set()
+
+    async def handler(request):
+        byte_range = parse_range(request)
+        if byte_range is None:
+            return web.Response(body=DATA)
+        start, end = byte_range
+        if end - start < 1000 or end in cut:
+            return partial_response(start, end)
+        # The first request of each part stops halfway through
+        cut.add(end)
+        response = web.StreamResponse(status=206, headers={
+            'Content-Range': f"bytes {start}-{end}/{len(DATA)}",
+            'Content-Length': str(end + 1 - start),
+        })
+        await response.prepare(request)
+        await response.write(DATA[start:start + (end + 1 - start) // 2])
+        request.transport.close()
+        return response
+
+    return handler, cut
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch):
+    # Split the test file into several parts without sending megabytes
+    monkeypatch.setattr(url_download, 'MIN_PART_SIZE', 128 * 1024)
+
+@pytest.fixture
+def allow_loopback(monkeypatch):
+    monkeypatch.setattr(url_download, 'is_public_address', lambda address: True)
+
+def download(handler, tmp_path, **kwargs):
+    async def run():
+        app = web.Application()
+        app.router.add_get('/files/{name}', handler)
+        server = TestServer(app, host='127.0.0.1')
+        await server.start_server()
+        try:
+            url = f"http://127.0.0.1:{server.port}/files/video.mkv"
+            source = await url_download.UrlSource.open(url)
+            result = await url_download.download_url(
+                url, str(tmp_path / "out.bin"), info=source.info, **kwargs
+            )
+            return source, result
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+def test_ranged_download_uses_several_connections(tmp_path, allow_loopback):
+    source, result = download(ranged, tmp_path, connections=4)
+    assert source.name == "Show.S01E02.mkv"
+    assert source.info['ranges'] and source.size == len(DATA)
+    assert result['connections'] == 4
+    assert result['size'] == len(DATA) and result['sha256'] == SHA256
+
+def test_server_without_ranges_streams(tmp_path, allow_loopback):
+    source, result = download(plain, tmp_path, connections=4)
+    assert source.name == "video.mkv" and not source.info['ranges']
+    assert result['connections'] == 1
+    assert result['sha256'] == SHA256
+
+def test_interrupted_range_is_resumed(tmp_path, allow_loopback):
+    handler, cut = interrupted()
+    _, result = download(handler, tmp_path, connections=4)
+    assert result['connections'] == 4 and len(cut) == 4
+    assert result['sha256'] == SHA256
+
+def test_non_206_range_falls_back_to_stream(tmp_path, allow_loopback):
+    _, result = download(probe_only_ranges, tmp_path, connections=4)
+    assert result['connections'] == 1
+    assert result['size'] == len(DATA) and result['sha256'] == SHA256
+
+def test_file_above_limit_is_refused(tmp_path, allow_loopback):
+    with pytest.raises(url_download.FileTooLarge):
+        download(ranged, tmp_path, max_size=1024)
+
+def test_stream_above_limit_is_stopped(tmp_path, allow_loopback):
+    with pytest.raises(url_download.FileTooLarge):
+        download(plain, tmp_path, max_size=1024)
+
+def test_redirect_to_private_address_is_blocked(tmp_path, monkeypatch):
+    monkeypatch.setattr(url_download, 'is_public_address', lambda address: address == '127.0.0.1')
+    with pytest.raises(url_download.BlockedAddress):
+        download(to_private, tmp_path)
+
+@pytest.mark.parametrize('url', [
+    "http://127.0.0.1/file.mkv",
+    "http://10.0.0.5/file.mkv",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/file.mkv",
+    "http://[::ffff:192.168.1.1]/file.mkv",
+    "ftp://example.com/file.mkv",
+])
+def test_non_public_urls_are_blocked(url):
+    with pytest.raises(url_download.BlockedAddress):
+        asyncio.run(url_download.UrlSource.open(url))
+
+def test_host_resolving_to_loopback_is_blocked():
+    with pytest.raises(url_download.BlockedAddress):
+        asyncio.run(url_download.UrlSource.open("http://localhost/file.mkv"))